@@ -0,0 +1 @@
+PYTHONPATH=src python -m benchmark.loadtest "$@"
@@ -0,0 +1,106 @@
+"""Module to publish static assets under content-hashed names"""
+
+import json
+import os
+
+from copystatic import sync_file
+from fileindex import scan_tree
+from manifest import AtomicOutput, hash_bytes, hash_file, remove_output
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+FINGERPRINT_LENGTH = 10
+
+ASSET_URLS = {}
+ASSET_DIGEST = ""
+
+
+def set_asset_urls(urls):
+    """Function to set the {url: fingerprinted url} mapping used when rendering.
+    Also run as the initializer of worker processes so they render the same urls."""
+    global ASSET_DIGEST  # pylint: disable=global-statement
+    urls = dict(urls)
+    ASSET_URLS.clear()
+    ASSET_URLS.update(urls)
+    ASSET_DIGEST = asset_digest(urls)
+
+
+def asset_url(url):
+    """Function that returns the fingerprinted url of an asset, or the url unchanged"""
+    return ASSET_URLS.get(url, url)
+
+
+def asset_digest(urls):
+    """Function that returns a hash of an asset mapping, which changes whenever
+    the rendered output of a page referencing an asset could, or an empty
+    string for an empty mapping"""
+    return hash_bytes(json.dumps(urls, sort_keys=True).encode()) if urls else ""
+
+
+def fingerprinted_path(rel_path, digest):
+    """Function that returns the path of an asset with a content hash before its extension"""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def fingerprint_assets(src, dest, manifest=None, link=False, changes=None, enabled=True):
+    """Function to copy every file under src to a fingerprinted name in dest,
+    such as images/logo.3f2a9c1b0d.png, and make it the url pages link to.
+
+    The file at the original name is left to the static sync, so old links keep
+    working. Source hashes are reused from the manifest while a file's size and
+    mtime are unchanged, and copies left by earlier builds that are no longer
+    current are removed. The mapping is written to dest/asset-manifest.json for
+    servers, set with set_asset_urls for rendering and returned. With enabled
+    unset, everything an earlier build fingerprinted is removed instead."""
+    old_entries = manifest["assets"] if manifest is not None else {}
+    new_entries = {}
+    urls = {}
+    for file in scan_tree(src).values() if enabled else ():
+        rel_path = file.rel_path
+        stat = [file.size, file.mtime_ns]
+        old_entry = old_entries.get(rel_path, {})
+        digest = old_entry["hash"] if old_entry.get("stat") == stat else hash_file(file.path)
+        target = fingerprinted_path(rel_path, digest)
+        target_path = os.path.join(dest, target)
+        if not os.path.exists(target_path):
+            print(f"***** Fingerprinting --> {file.path} to {target_path} *****")
+            sync_file(file, target_path, link)
+            if changes is not None:
+                changes.append(("M", target_path))
+        new_entries[rel_path] = {"stat": stat, "hash": digest, "target": target}
+        urls["/" + rel_path.replace(os.sep, "/")] = "/" + target.replace(os.sep, "/")
+
+    live_targets = {entry["target"] for entry in new_entries.values()}
+    for entry in old_entries.values():
+        if entry["target"] not in live_targets:
+            target_path = os.path.join(dest, entry["target"])
+            if os.path.exists(target_path):
+                print(f"***** Removing --> {target_path} *****")
+                remove_output(target_path, dest)
+                if changes is not None:
+                    changes.append(("D", target_path))
+
+    manifest_path = os.path.join(dest, ASSET_MANIFEST_NAME)
+    if urls:
+        with AtomicOutput(manifest_path) as out:
+            out.write(json.dumps(urls, indent=1, sort_keys=True))
+        if out.changed and changes is not None:
+            changes.append(("M", manifest_path))
+    elif os.path.exists(manifest_path):
+        os.remove(manifest_path)
+        if changes is not None:
+            changes.append(("D", manifest_path))
+    if manifest is not None:
+        manifest["assets"] = new_entries
+    set_asset_urls(urls)
+    return urls
+
+
+def load_immutable_paths(directory):
+    """Function that returns the set of fingerprinted url paths listed in a
+    directory's asset manifest, or an empty set when there is none"""
+    try:
+        with open(os.path.join(directory, ASSET_MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return set(json.load(f).values())
+    except (OSError, ValueError):
+        return set()
@@ -0,0 +1,7 @@
+"""Package for measuring build throughput on synthetic content trees.
+
+Run with: ./bench.sh --pages 500 --shape mixed
+
+The blocks and inline modules are microbenchmarks of the block classifier and
+the inline parser against the code they replaced, run with
+PYTHONPATH=src python -m benchmark.blocks or benchmark.inline."""
@@ -0,0 +1,116 @@
+"""Command line entry point of the benchmark suite"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+
+from benchmark.corpus import SHAPES, generate_corpus
+from benchmark.stages import run_stages
+
+DEFAULT_TEMPLATE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "template.html"
+)
+RESULTS_DIR = ".build/benchmarks"
+
+
+def parse_args(argv=None):
+    """Function to parse the command line options"""
+    parser = argparse.ArgumentParser(description="Time each build stage on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200, help="number of pages to generate")
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="mixed", help="block mix")
+    parser.add_argument("--fanout", type=int, default=10, help="entries per directory")
+    parser.add_argument("--seed", type=int, default=0, help="corpus random seed")
+    parser.add_argument("--repeat", type=int, default=3, help="runs, the fastest is kept per stage")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="template to render with")
+    parser.add_argument("--output", help="results file, defaults to .build/benchmarks/<time>-<commit>.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="percent slowdown reported as a regression"
+    )
+    return parser.parse_args(argv)
+
+
+def git_commit():
+    """Function that returns the current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Function that prints the change of every stage against a baseline and
+    returns the names of stages slower by more than threshold percent"""
+    regressions = []
+    print(f"\n{'stage':<22}{'baseline ms':>12}{'current ms':>12}{'change':>9}")
+    for stage, seconds in results["stages"].items():
+        old = baseline["stages"].get(stage)
+        if not old:
+            continue
+        change = (seconds - old) / old * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(stage)
+            flag = "  REGRESSION"
+        print(f"{stage:<22}{old * 1000:>12.2f}{seconds * 1000:>12.2f}{change:>8.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    """Function to generate the corpus, time the stages and save the results"""
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as root:
+        paths = generate_corpus(root, args.pages, args.blocks, args.shape, args.fanout, args.seed)
+        size = sum(os.path.getsize(path) for path in paths)
+        runs = [run_stages(paths, args.template) for _ in range(args.repeat)]
+    stages = {stage: min(run[stage] for run in runs) for stage in runs[0]}
+    results = {
+        "commit": git_commit(),
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {
+            "pages": args.pages,
+            "blocks": args.blocks,
+            "shape": args.shape,
+            "fanout": args.fanout,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "corpus_bytes": size,
+        "stages": stages,
+    }
+    print(f"{args.pages} pages, {size / 1e6:.2f} MB of markdown, shape {args.shape}")
+    print(f"{'stage':<22}{'ms':>10}{'MB/s':>10}")
+    for stage, seconds in stages.items():
+        print(f"{stage:<22}{seconds * 1000:>10.2f}{size / 1e6 / seconds if seconds else 0:>10.1f}")
+
+    output = args.output
+    if output is None:
+        stamp = results["time"].replace(":", "").replace("+0000", "")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != results["params"]:
+            print("Warning: baseline was run with different parameters")
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
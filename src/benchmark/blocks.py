@@ -0,0 +1,59 @@
+"""Microbenchmark of the per-block cost of classifying and rendering markdown blocks.
+
+Run with: PYTHONPATH=src python -m benchmark.blocks"""
+
+import timeit
+
+from block_markdown import classify_block, render_block
+
+BLOCKS = {
+    "heading": "### A heading with **bold** text",
+    "paragraph": "A plain paragraph of prose with *italic* text\nthat runs over two lines.",
+    "code": "```\nvalue = compute(1) + 2\nprint(value)\n```",
+    "quote": "> A quote\n> that keeps going\n> for three lines",
+    "unordered_list": "\n".join(f"- item number {i}" for i in range(8)),
+    "ordered_list": "\n".join(f"{i}. item number {i}" for i in range(1, 9)),
+}
+
+
+def legacy_block_to_block_type(block):
+    """Function reproducing the classifier classify_block replaced, which split
+    the whole block into words and lines before looking at its type"""
+    heading = block.split()
+    lines = block.splitlines()
+    if heading[0] in {"#", "##", "###", "####", "#####", "######"}:
+        return "heading"
+    if block.startswith("```"):
+        return "code"
+    if block.startswith("> "):
+        if all(line.startswith("> ") for line in lines):
+            return "quote"
+    if block.startswith("* ") or block.startswith("- "):
+        if all(line.startswith("* ") or line.startswith("- ") for line in lines):
+            return "unordered_list"
+    if block.startswith("1. "):
+        if all(line.startswith(f"{i}. ") for i, line in enumerate(lines, 1)):
+            return "ordered_list"
+    return "paragraph"
+
+
+def per_call_ns(func, arg, number=20000):
+    """Function that returns the best per-call time in nanoseconds over 5 repeats"""
+    timer = timeit.Timer(lambda: func(arg))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e9
+
+
+def main():
+    """Function to run the benchmark and print a table of per-block costs"""
+    print(f"{'block':<16}{'legacy ns':>11}{'classify ns':>13}{'render ns':>11}")
+    for name, text in BLOCKS.items():
+        assert classify_block(text).block_type == legacy_block_to_block_type(text) == name
+        legacy = per_call_ns(legacy_block_to_block_type, text)
+        classify = per_call_ns(classify_block, text)
+        block = classify_block(text)
+        render = per_call_ns(render_block, block, number=5000)
+        print(f"{name:<16}{legacy:>11.0f}{classify:>13.0f}{render:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Module to generate synthetic markdown content trees for benchmarking"""
+
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "while elves dwarves and men each received their own rings of lesser might"
+).split()
+
+SHAPES = {
+    "prose": {"paragraph": 8, "heading": 2, "unordered_list": 1, "quote": 1},
+    "mixed": {
+        "paragraph": 5,
+        "heading": 2,
+        "unordered_list": 2,
+        "ordered_list": 1,
+        "code": 1,
+        "quote": 1,
+        "links": 1,
+        "images": 1,
+    },
+    "links": {"paragraph": 2, "heading": 1, "links": 6, "unordered_list": 1},
+    "images": {"paragraph": 2, "heading": 1, "images": 6},
+    "code": {"paragraph": 2, "heading": 1, "code": 6},
+}
+
+
+def sentence(rng, words=12):
+    """Function that returns a run of words with some inline markup"""
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.05:
+            word = f"**{word}**"
+        elif roll < 0.10:
+            word = f"*{word}*"
+        elif roll < 0.13:
+            word = f"`{word}`"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def link_text(rng, count):
+    """Function that returns a paragraph made mostly of links"""
+    return " ".join(
+        f"[{rng.choice(WORDS)}](https://example.com/{rng.randrange(10000)})"
+        for _ in range(count)
+    )
+
+
+def image_text(rng, count):
+    """Function that returns a paragraph made mostly of images"""
+    return " ".join(
+        f"![{rng.choice(WORDS)}](/images/{rng.randrange(1000)}.png)" for _ in range(count)
+    )
+
+
+def make_block(rng, kind):
+    """Function that returns one markdown block of the given kind"""
+    if kind == "heading":
+        return f"{'#' * rng.randint(2, 6)} {sentence(rng, 5)}"
+    if kind == "unordered_list":
+        return "\n".join(f"- {sentence(rng, 8)}" for _ in range(rng.randint(2, 6)))
+    if kind == "ordered_list":
+        return "\n".join(f"{i}. {sentence(rng, 8)}" for i in range(1, rng.randint(3, 7)))
+    if kind == "code":
+        lines = [f"value_{i} = compute({rng.randrange(100)}) + 2" for i in range(rng.randint(3, 12))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if kind == "quote":
+        return "\n".join(f"> {sentence(rng, 10)}" for _ in range(rng.randint(1, 4)))
+    if kind == "links":
+        return link_text(rng, rng.randint(10, 40))
+    if kind == "images":
+        return image_text(rng, rng.randint(3, 10))
+    return "\n".join(sentence(rng, 16) for _ in range(rng.randint(1, 4)))
+
+
+def make_document(rng, blocks, shape):
+    """Function that returns a markdown document with an H1 title and the given number of blocks"""
+    weights = SHAPES[shape]
+    kinds = rng.choices(list(weights), weights=list(weights.values()), k=blocks)
+    return "\n\n".join([f"# {sentence(rng, 6)}"] + [make_block(rng, kind) for kind in kinds])
+
+
+def generate_corpus(root, pages=100, blocks=40, shape="mixed", fanout=10, seed=0):
+    """Function to write a content tree of markdown pages under root.
+
+    Pages are spread over nested directories with at most fanout entries each,
+    so deep trees are exercised as well as wide ones. Returns the list of
+    markdown paths written."""
+    rng = random.Random(seed)
+    paths = []
+    for page in range(pages):
+        parts = []
+        index = page
+        while index >= fanout:
+            index //= fanout
+            parts.append(f"d{index % fanout}")
+        dir_path = os.path.join(root, *reversed(parts), f"page{page}")
+        os.makedirs(dir_path, exist_ok=True)
+        path = os.path.join(dir_path, "index.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_document(rng, blocks, shape))
+        paths.append(path)
+    return paths
@@ -0,0 +1,59 @@
+"""Benchmark comparing text_to_textnodes with the pass-per-type pipeline.
+
+Run with: PYTHONPATH=src python -m benchmark.inline"""
+
+import timeit
+
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode
+
+PLAIN_PROSE = (
+    "In the annals of fantasy literature and the broader realm of creative "
+    "world-building, few sagas can rival the intricate tapestry woven by Tolkien. "
+) * 40
+MIXED_PROSE = (
+    "This is **bold** with *italic* and `code`, an ![image](/a.png) and a "
+    "[link](https://example.com). "
+) * 40
+LINK_DENSE = " ".join(f"[link {i}](https://example.com/{i})" for i in range(400))
+LINK_DENSE_XL = " ".join(f"[link {i}](https://example.com/{i})" for i in range(8000))
+
+
+def multipass_text_to_textnodes(text):
+    """Function reproducing the five pass pipeline text_to_textnodes replaced"""
+    text_nodes = split_nodes_delimiter([TextNode(text, "text")], "`", "code")
+    text_nodes = split_nodes_delimiter(text_nodes, "**", "bold")
+    text_nodes = split_nodes_delimiter(text_nodes, "*", "italic")
+    text_nodes = split_nodes_image(text_nodes)
+    text_nodes = split_nodes_link(text_nodes)
+    return text_nodes
+
+
+def best_time(func, text, number):
+    """Function that returns the best per-call time in microseconds over 5 repeats"""
+    timer = timeit.Timer(lambda: func(text))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main():
+    """Function to run the benchmark and print a table of results"""
+    print(f"{'input':<12}{'chars':>8}{'multipass us':>15}{'single us':>12}{'speedup':>10}")
+    for name, text, number in (
+        ("plain", PLAIN_PROSE, 2000),
+        ("mixed", MIXED_PROSE, 200),
+        ("link-dense", LINK_DENSE, 20),
+        ("links-xl", LINK_DENSE_XL, 2),
+    ):
+        assert text_to_textnodes(text) == multipass_text_to_textnodes(text)
+        old = best_time(multipass_text_to_textnodes, text, number)
+        new = best_time(text_to_textnodes, text, number)
+        print(f"{name:<12}{len(text):>8}{old:>15.1f}{new:>12.1f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Command line load test comparing the built-in server against python -m http.server"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from daemon import percentile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVERS = {
+    "http.server": lambda directory, port: [
+        sys.executable, "-m", "http.server", str(port), "--directory", directory,
+    ],
+    "serve": lambda directory, port: [
+        sys.executable, "-c", "import sys, server; server.serve(sys.argv[1], int(sys.argv[2]))",
+        directory, str(port),
+    ],
+}
+
+
+def parse_args(argv=None):
+    """Function to parse the command line options"""
+    parser = argparse.ArgumentParser(description="Load test the static servers on a built site")
+    parser.add_argument("--directory", default="public", help="built site to serve")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per server")
+    parser.add_argument("--concurrency", type=int, default=8, help="client processes")
+    parser.add_argument("--port", type=int, default=8901, help="first port to listen on")
+    parser.add_argument(
+        "--servers", nargs="+", choices=sorted(SERVERS), default=sorted(SERVERS), help="servers to test"
+    )
+    return parser.parse_args(argv)
+
+
+def site_paths(directory):
+    """Function that returns the url path of every file in a built site, skipping precompressed variants"""
+    paths = []
+    for dir_path, _, files in os.walk(directory):
+        for file in sorted(files):
+            if file.endswith((".gz", ".zst")):
+                continue
+            rel_path = os.path.relpath(os.path.join(dir_path, file), directory)
+            paths.append("/" + rel_path.replace(os.sep, "/").removesuffix("index.html"))
+    return sorted(paths)
+
+
+def wait_for_port(port, timeout=10):
+    """Function that blocks until something accepts connections on a local port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Nothing listening on port {port}")
+
+
+def client(port, paths, count, offset):
+    """Function run in a client process that sends count requests over one
+    connection, reconnecting when the server closes it, and returns their
+    latencies in seconds"""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    headers = {"Accept-Encoding": "gzip"}
+    for index in range(count):
+        path = paths[(offset + index) % len(paths)]
+        start = time.perf_counter()
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+            connection.close()
+    connection.close()
+    return latencies
+
+
+def run(name, directory, port, requests, concurrency):
+    """Function that starts one server, loads it and returns its results"""
+    with subprocess.Popen(
+        SERVERS[name](directory, port),
+        env={**os.environ, "PYTHONPATH": SRC_DIR},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    ) as process:
+        try:
+            wait_for_port(port)
+            paths = site_paths(directory)
+            per_client = requests // concurrency
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=concurrency) as pool:
+                latencies = sorted(
+                    latency
+                    for result in pool.map(
+                        client,
+                        [port] * concurrency,
+                        [paths] * concurrency,
+                        [per_client] * concurrency,
+                        range(concurrency),
+                    )
+                    for latency in result
+                )
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+    return {
+        "server": name,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p90": percentile(latencies, 0.90) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "max": latencies[-1] * 1000,
+    }
+
+
+def main(argv=None):
+    """Entry point of the load test"""
+    args = parse_args(argv)
+    if not os.path.isdir(args.directory):
+        sys.exit(f"{args.directory} does not exist, build the site first")
+    results = [
+        run(name, args.directory, args.port + index, args.requests, args.concurrency)
+        for index, name in enumerate(args.servers)
+    ]
+    print(f"{'server':<12} {'requests':>8} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for result in results:
+        print(
+            f"{result['server']:<12} {result['requests']:>8} {result['rps']:>9.0f} {result['p50']:>8.2f} "
+            f"{result['p90']:>8.2f} {result['p99']:>8.2f} {result['max']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
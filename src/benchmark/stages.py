@@ -0,0 +1,104 @@
+"""Module to time each stage of the build separately on a set of markdown files"""
+
+import io
+import os
+import tempfile
+import time
+
+from block_markdown import (
+    BLOCK_CACHE,
+    BLOCK_TYPE_CODE,
+    BLOCK_TYPE_HEADING,
+    BLOCK_TYPE_ORDERED_LIST,
+    BLOCK_TYPE_QUOTE,
+    BLOCK_TYPE_UNORDERED_LIST,
+    block_to_block_type,
+    code_block_to_html,
+    markdown_to_blocks,
+    markdown_to_html,
+)
+from gencontent import extract_title
+from htmlnode import FROZEN_NODES
+from inline_markdown import text_to_textnodes
+from template import compile_template
+
+
+def inline_texts(block, block_type):
+    """Function that returns the strings a block's handler passes to the inline parser"""
+    if block_type == BLOCK_TYPE_CODE:
+        return []
+    if block_type == BLOCK_TYPE_HEADING:
+        return [block.split(" ", 1)[1]]
+    if block_type == BLOCK_TYPE_QUOTE:
+        return ["\n".join(line.strip("> ") for line in block.splitlines())]
+    if block_type in (BLOCK_TYPE_UNORDERED_LIST, BLOCK_TYPE_ORDERED_LIST):
+        return [line.split(" ", 1)[1] for line in block.splitlines()]
+    return [block]
+
+
+def timed(results, name, func, *args):
+    """Function that runs func, records its wall time under name and returns its result"""
+    start = time.perf_counter()
+    value = func(*args)
+    results[name] = results.get(name, 0.0) + time.perf_counter() - start
+    return value
+
+
+def run_stages(paths, template_path):
+    """Function that runs every build stage over the markdown files in turn and
+    returns a {stage: seconds} dictionary. Each stage consumes the previous
+    stage's output, so no stage's time includes another's work. The block cache
+    and frozen nodes are cleared first, so repeats time a cold build rather than
+    cache hits left by the previous run."""
+    BLOCK_CACHE.clear()
+    FROZEN_NODES.clear()
+    results = {}
+    docs = timed(results, "read", read_files, paths)
+    blocks = timed(results, "markdown_to_blocks", lambda: [markdown_to_blocks(md) for md in docs])
+    typed = timed(
+        results,
+        "block_to_block_type",
+        lambda: [[(block, block_to_block_type(block)) for block in doc] for doc in blocks],
+    )
+    texts = [text for doc in typed for block in doc for text in inline_texts(*block)]
+    timed(results, "text_to_textnodes", lambda: [text_to_textnodes(text) for text in texts])
+    code = [block for doc in typed for block, block_type in doc if block_type == BLOCK_TYPE_CODE]
+    timed(
+        results,
+        "code_block_to_html",
+        lambda: [code_block_to_html(block, BLOCK_TYPE_CODE).to_html() for block in code],
+    )
+    trees = timed(results, "markdown_to_html", lambda: [markdown_to_html(md) for md in docs])
+    html = timed(results, "to_html", lambda: [tree.to_html() for tree in trees])
+    template = timed(results, "template_compile", compile_template, template_path)
+    pages = timed(
+        results,
+        "template_render",
+        lambda: [render(template, extract_title(md), body) for md, body in zip(docs, html)],
+    )
+    with tempfile.TemporaryDirectory() as out_dir:
+        timed(results, "write", write_files, out_dir, pages)
+    return results
+
+
+def read_files(paths):
+    """Function that returns the contents of every file"""
+    docs = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            docs.append(f.read())
+    return docs
+
+
+def render(template, title, body):
+    """Function that renders a page to a string"""
+    buffer = io.StringIO()
+    template.render(buffer, {"Title": title, "Content": body})
+    return buffer.getvalue()
+
+
+def write_files(out_dir, pages):
+    """Function that writes each page to its own file"""
+    for i, page in enumerate(pages):
+        with open(os.path.join(out_dir, f"{i}.html"), "w", encoding="utf-8") as f:
+            f.write(page)
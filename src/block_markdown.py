@@ -2,11 +2,12 @@
 
 # pylint: disable=line-too-long
 
-import re
+from collections import OrderedDict, namedtuple
 
-from htmlnode import LeafNode, ParentNode
+import profiling
+from htmlnode import FrozenNode, LeafNode, ParentNode, escape_html, freeze
 from inline_markdown import text_to_textnodes
-from textnode import text_node_to_html_node
+from textnode import text_to_html_node
 
 BLOCK_TYPE_PARAGRAPH = "paragraph"
 BLOCK_TYPE_HEADING = "heading"
@@ -15,161 +16,326 @@ BLOCK_TYPE_QUOTE = "quote"
 BLOCK_TYPE_UNORDERED_LIST = "unordered_list"
 BLOCK_TYPE_ORDERED_LIST = "ordered_list"
 
+HEADING_MARKERS = frozenset({"#", "##", "###", "####", "#####", "######"})
+
+# A classified block. lines holds the block split into lines for the line based
+# types (quote and both lists) and is None for the others.
+Block = namedtuple("Block", ["text", "block_type", "lines"])
+
 
 def markdown_to_blocks(markdown):
     """Function for splitting a markdown document into individual blocks"""
-    get_blocks = re.split("\n\\s+", markdown)
-    blocks = []
-    for block in get_blocks:
-        blocks.append(block.strip())
-    return blocks
+    return list(scan_blocks(markdown.split("\n")))
+
+
+def scan_blocks(lines):
+    """Generator that reads markdown from an iterable of lines, such as an open
+    file, and yields each block as a stripped string as soon as it ends.
+
+    Blocks are separated by blank lines, except inside a ``` code fence, where
+    blank and indented lines belong to the code. Only the current block is held
+    in memory."""
+    buffer = []
+    in_code = False
+    for line in lines:
+        line = line.rstrip("\n")
+        if in_code:
+            buffer.append(line)
+            if line.rstrip().endswith("```"):
+                in_code = False
+            continue
+        if line.strip() == "":
+            if buffer:
+                yield "\n".join(buffer).strip()
+                buffer = []
+            continue
+        if not buffer and line.lstrip().startswith("```"):
+            fence = line.strip()
+            in_code = len(fence) < 6 or not fence.endswith("```")
+        buffer.append(line)
+    if buffer:
+        yield "\n".join(buffer).strip()
+
+
+def iter_blocks(lines):
+    """Generator that yields a classified Block record for each block
+    scan_blocks finds in an iterable of lines"""
+    for text in scan_blocks(lines):
+        yield classify_block(text)
 
 
 def block_to_block_type(block):
     """Function that takes a markdown block and returns it's block type"""
+    return classify_block(block).block_type
+
 
-    heading_opts = {"#", "##", "###", "####", "#####", "######"}
-    heading = block.split()
-    lines = block.splitlines()
-    if heading[0] in heading_opts:
-        return BLOCK_TYPE_HEADING
-    if block.startswith("```"):
+def classify_block(block):
+    """Function that decides a block's type and validates it in the same pass,
+    returning a Block record that keeps the lines the validation split off"""
+    # Block records are built with tuple.__new__, which skips the argument
+    # handling of the namedtuple constructor and halves the cost per block
+    first = block[0]
+    if first == "#" and block.split(None, 1)[0] in HEADING_MARKERS:
+        return tuple.__new__(Block, (block, BLOCK_TYPE_HEADING, None))
+    if first == "`" and block.startswith("```"):
         if not block.endswith("```"):
             raise SyntaxError("Invalid Markdown: Code block must end with ```")
-        return BLOCK_TYPE_CODE
-    if block.startswith("> "):
+        return tuple.__new__(Block, (block, BLOCK_TYPE_CODE, None))
+    if first == ">" and block.startswith("> "):
+        lines = block.splitlines()
         for line in lines:
             if not line.startswith("> "):
                 raise SyntaxError(
                     "Invalid Markdown: Every line in a quote block must begin with > followed by a space"
                 )
-        return BLOCK_TYPE_QUOTE
-    if block.startswith("* ") or block.startswith("- "):
+        return tuple.__new__(Block, (block, BLOCK_TYPE_QUOTE, lines))
+    if (first == "*" or first == "-") and block.startswith(("* ", "- ")):
+        lines = block.splitlines()
         for line in lines:
-            if not line.startswith("* ") and not line.startswith("- "):
+            if not line.startswith(("* ", "- ")):
                 raise SyntaxError(
                     "Invalid Markdown: Every line in an unordered list list must start with * or -"
                 )
-        return BLOCK_TYPE_UNORDERED_LIST
-    if block.startswith("1. "):
+        return tuple.__new__(Block, (block, BLOCK_TYPE_UNORDERED_LIST, lines))
+    if first == "1" and block.startswith("1. "):
+        lines = block.splitlines()
         for i, line in enumerate(lines, 1):
             if not line.startswith(f"{i}. "):
                 raise SyntaxError(
                     "Invalid Markdown: Every line in an ordered list must start with a number followed by a . and a space, additionally each line must increment the number by one"
                 )
-        return BLOCK_TYPE_ORDERED_LIST
-    return BLOCK_TYPE_PARAGRAPH
+        return tuple.__new__(Block, (block, BLOCK_TYPE_ORDERED_LIST, lines))
+    return tuple.__new__(Block, (block, BLOCK_TYPE_PARAGRAPH, None))
 
 
 def text_to_children(text):
     """function that takes markdown text and returns a list of htmlnodes"""
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for node in text_nodes:
-        children.append(text_node_to_html_node(node))
-    return children
+    if profiling.ACTIVE is not None:
+        with profiling.ACTIVE.span("text_to_textnodes", "stage"):
+            return text_to_textnodes(text, text_to_html_node)
+    return text_to_textnodes(text, text_to_html_node)
 
 
 def heading_block_to_html(block, block_type):
     """Function to convert a heading block to html"""
-
-    split = block.split(" ", 1)
-    heading = split[0]
-    children = text_to_children(split[1])
     if block_type != BLOCK_TYPE_HEADING:
         raise TypeError("This function only accepts BLOCK_TYPE_HEADING")
-    if len(heading) == 1:
-        return ParentNode("h1", children)
-    if len(heading) == 2:
-        return ParentNode("h2", children)
-    if len(heading) == 3:
-        return ParentNode("h3", children)
-    if len(heading) == 4:
-        return ParentNode("h4", children)
-    if len(heading) == 5:
-        return ParentNode("h5", children)
-    if len(heading) == 6:
-        return ParentNode("h6", children)
-    raise SyntaxError(
-        "Heading must conform to one of: '# ', '## ', '### ', '#### ', '##### ', '###### '"
-    )
+    return render_heading(Block(block, block_type, None))
 
 
 def code_block_to_html(block, block_type):
     """Function that takes a markdown code block & returns an html code block"""
     if block_type != BLOCK_TYPE_CODE:
         raise TypeError("This function only accepts BLOCK_TYPE_CODE")
-    block = block.strip("```")
-    children = text_to_children(block)
-    return ParentNode("pre", [ParentNode("code", children)])
+    return render_code(Block(block, block_type, None))
 
 
 def quote_block_to_html(block, block_type):
     """Function that takes a markdown quote block and returns an html quote block"""
     if block_type != BLOCK_TYPE_QUOTE:
         raise TypeError("This function only accepts BLOCK_TYPE_QUOTE")
-    old_lines = block.splitlines()
-    lines = []
-    for line in old_lines:
-        lines.append(line.strip("> "))
-    new_block = "\n".join(lines)
-    children = text_to_children(new_block)
-    return ParentNode("blockquote", children)
+    return render_quote(Block(block, block_type, block.splitlines()))
 
 
 def unordered_list_block_to_html(block, block_type):
     """Function that takes a markdown unordered list block and returns an html unordered list block"""
     if block_type != BLOCK_TYPE_UNORDERED_LIST:
         raise TypeError("This function only accepts BLOCK_TYPE_UNORDERED_LIST")
-    old_lines = block.splitlines()
-    children = []
-    if block.startswith("* "):
-        for line in old_lines:
-            inner_children = text_to_children(line.strip("* "))
-            children.append(ParentNode("li", inner_children))
-    if block.startswith("- "):
-        for line in old_lines:
-            inner_children = text_to_children(line.strip("- "))
-            children.append(ParentNode("li", inner_children))
-    return ParentNode("ul", children)
+    return render_unordered_list(Block(block, block_type, block.splitlines()))
 
 
 def ordered_list_block_to_html(block, block_type):
     """Function that takes a markdown ordered list block and returns an html ordered list block"""
     if block_type != BLOCK_TYPE_ORDERED_LIST:
         raise TypeError("This function only accepts BLOCK_TYPE_ORDERED_LIST")
-    old_lines = block.splitlines()
-    children = []
-    for i, line in enumerate(old_lines, 1):
-        inner_children = text_to_children(line.strip(f"{i}. "))
-        children.append(ParentNode("li", inner_children))
-    return ParentNode("ol", children)
+    return render_ordered_list(Block(block, block_type, block.splitlines()))
 
 
 def paragraph_block_to_html(block, block_type):
     """Function that takes a markdown paragraph block and returns an html paragraph block"""
     if block_type != BLOCK_TYPE_PARAGRAPH:
         raise TypeError("This function only accepts BLOCK_TYPE_PARAGRAPH")
-    children = text_to_children(block)
-    return ParentNode("p", children)
+    return render_paragraph(Block(block, block_type, None))
+
+
+def render_heading(block):
+    """Function that renders a classified heading Block"""
+    heading, separator, text = block.text.partition(" ")
+    if not separator or len(heading) > 6:
+        raise SyntaxError(
+            "Heading must conform to one of: '# ', '## ', '### ', '#### ', '##### ', '###### '"
+        )
+    return ParentNode(HEADING_TAGS[len(heading)], text_to_children(text))
+
+
+def render_code(block):
+    """Function that renders a classified code Block. Code is written verbatim,
+    only escaped, without going through the inline parser."""
+    return ParentNode("pre", [LeafNode("code", escape_html(block.text.strip("```")))])
+
+
+def render_quote(block):
+    """Function that renders a classified quote Block"""
+    text = "\n".join([line.strip("> ") for line in block.lines])
+    return ParentNode("blockquote", text_to_children(text))
+
+
+def render_unordered_list(block):
+    """Function that renders a classified unordered list Block"""
+    marker = block.text[:2]
+    return ParentNode(
+        "ul", [ParentNode("li", text_to_children(line.strip(marker))) for line in block.lines]
+    )
+
+
+def render_ordered_list(block):
+    """Function that renders a classified ordered list Block"""
+    return ParentNode(
+        "ol",
+        [
+            ParentNode("li", text_to_children(line.strip(f"{i}. ")))
+            for i, line in enumerate(block.lines, 1)
+        ],
+    )
+
+
+def render_paragraph(block):
+    """Function that renders a classified paragraph Block"""
+    return ParentNode("p", text_to_children(block.text))
+
+
+HEADING_TAGS = {1: "h1", 2: "h2", 3: "h3", 4: "h4", 5: "h5", 6: "h6"}
+
+BLOCK_RENDERERS = {
+    BLOCK_TYPE_HEADING: render_heading,
+    BLOCK_TYPE_CODE: render_code,
+    BLOCK_TYPE_QUOTE: render_quote,
+    BLOCK_TYPE_UNORDERED_LIST: render_unordered_list,
+    BLOCK_TYPE_ORDERED_LIST: render_ordered_list,
+    BLOCK_TYPE_PARAGRAPH: render_paragraph,
+}
+
+
+def render_block(block):
+    """Function that converts a classified Block to an html node through the renderer table"""
+    return BLOCK_RENDERERS[block.block_type](block)
+
+
+class BlockCache:
+    """Class holding a bounded LRU cache from block text to its rendered html node.
+
+    Identical blocks, such as shared notes or repeated headings, are classified
+    and rendered once. Cached nodes are shared by every document that uses the
+    block, so they must be treated as read-only. A block is frozen the first time
+    it is found in the cache, so a shared block is serialized once however many
+    pages it is written to, while blocks used only once don't pay for freezing.
+    A maxsize of 0 turns caching off."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, profiler=None):
+        """Method that returns the html node for a block, rendering it on a miss.
+        A profiler, when given, records the classify and render spans of misses."""
+        node = self.entries.get(text)
+        if node is not None:
+            self.entries.move_to_end(text)
+            self.hits += 1
+            if not isinstance(node, FrozenNode):
+                node = self.entries[text] = freeze(node)
+            return node
+        self.misses += 1
+        if profiler is None:
+            node = render_block(classify_block(text))
+        else:
+            with profiler.span("classify_block", "stage"):
+                block = classify_block(text)
+            with profiler.span(block.block_type, "block"):
+                node = render_block(block)
+        if self.maxsize > 0:
+            self.entries[text] = node
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return node
+
+    def resize(self, maxsize):
+        """Method to change the size limit, evicting the least recently used entries to fit"""
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Method to drop every entry and reset the statistics"""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Method that returns the hit and miss counts, current size and hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+BLOCK_CACHE = BlockCache()
 
 
 def markdown_to_html(markdown):
     """Function that takes a markdown document and returns an html document"""
-    children = []
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        if block_type == BLOCK_TYPE_HEADING:
-            children.append(heading_block_to_html(block, block_type))
-        if block_type == BLOCK_TYPE_CODE:
-            children.append(code_block_to_html(block, block_type))
-        if block_type == BLOCK_TYPE_QUOTE:
-            children.append(quote_block_to_html(block, block_type))
-        if block_type == BLOCK_TYPE_UNORDERED_LIST:
-            children.append(unordered_list_block_to_html(block, block_type))
-        if block_type == BLOCK_TYPE_ORDERED_LIST:
-            children.append(ordered_list_block_to_html(block, block_type))
-        if block_type == BLOCK_TYPE_PARAGRAPH:
-            children.append(paragraph_block_to_html(block, block_type))
-    return ParentNode("div", children)
+    if profiling.ACTIVE is not None:
+        return profiled_markdown_to_html(markdown, profiling.ACTIVE)
+    render = BLOCK_CACHE.render
+    return ParentNode("div", [render(text) for text in scan_blocks(markdown.split("\n"))])
+
+
+def write_markdown_html(lines, fp):
+    """Function that renders markdown read from an iterable of lines straight to
+    a file-like object, one block at a time, producing the same output as
+    markdown_to_html(...).write_html(fp). Peak memory is bounded by the largest
+    block rather than the whole document, so blocks skip the block cache, which
+    would keep up to its maxsize of them alive."""
+    if profiling.ACTIVE is not None:
+        profiled_write_markdown_html(lines, fp, profiling.ACTIVE)
+        return
+    fp.write("<div>")
+    for text in scan_blocks(lines):
+        render_block(classify_block(text)).write_html(fp)
+    fp.write("</div>")
+
+
+def profiled_write_markdown_html(lines, fp, profiler):
+    """Function doing the work of write_markdown_html while recording, for each
+    block, a span for reading it, one for classifying it, one named after its
+    type for rendering it and one for writing it"""
+    fp.write("<div>")
+    blocks = scan_blocks(lines)
+    while True:
+        with profiler.span("read", "stage"):
+            text = next(blocks, None)
+        if text is None:
+            break
+        with profiler.span("classify_block", "stage"):
+            block = classify_block(text)
+        with profiler.span(block.block_type, "block"):
+            node = render_block(block)
+        with profiler.span("write", "stage"):
+            node.write_html(fp)
+    fp.write("</div>")
+
+
+def profiled_markdown_to_html(markdown, profiler):
+    """Function doing the work of markdown_to_html while recording a span for
+    block splitting and, for each block missing from the block cache, one for
+    classifying it and one named after its type for rendering it"""
+    with profiler.span("markdown_to_blocks", "stage"):
+        blocks = markdown_to_blocks(markdown)
+    render = BLOCK_CACHE.render
+    return ParentNode("div", [render(text, profiler) for text in blocks])
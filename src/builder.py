@@ -0,0 +1,94 @@
+"""Module to render and build the site from a long-running process"""
+
+import io
+import os
+
+from copystatic import sync_static_dir
+from gencontent import content_html, fill_template, generate_pages_recursive
+from manifest import load_manifest, save_manifest
+from template import load_template
+from watch import apply_changes
+
+
+class Renderer:
+    """Class rendering markdown strings to html for previews.
+
+    The template is compiled on first use and again only when it changes on
+    disk, and rendered blocks are shared with every other render through the
+    block cache, so editing one block of a document only parses that block.
+    A ParseCache, when given, keeps whole documents across restarts. Not thread
+    safe, callers rendering from several threads must hold a lock."""
+
+    def __init__(self, template_path, cache=None):
+        self.template_path = template_path
+        self.cache = cache
+
+    def render(self, markdown):
+        """Method that returns the html content of a markdown document"""
+        html = content_html(markdown, self.cache)
+        return html if isinstance(html, str) else html.to_html()
+
+    def render_page(self, markdown):
+        """Method that returns a markdown document rendered into the template,
+        raising ValueError when it does not begin with an H1 heading"""
+        template = load_template(self.template_path)
+        buffer = io.StringIO()
+        fill_template(buffer, template, markdown, content_html(markdown, self.cache))
+        return buffer.getvalue()
+
+
+class Builder:
+    """Class holding a site's paths, manifest and renderer between builds.
+
+    paths is a dictionary with content, static, template and public entries,
+    spelled as the manifest was built with them. The manifest is loaded from
+    manifest_path unless one is given and saved after every build."""
+
+    def __init__(self, paths, manifest_path, manifest=None, cache=None):
+        self.paths = paths
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path) if manifest is None else manifest
+        self.cache = cache
+        self.renderer = Renderer(paths["template"], cache)
+
+    def build(self, jobs=1, changes=None):
+        """Method to bring the whole public directory up to date, returning the
+        static and page stats. The manifest is saved even when a page fails."""
+        os.makedirs(self.paths["public"], exist_ok=True)
+        static_stats = sync_static_dir(
+            self.paths["static"], self.paths["public"], self.manifest, changes=changes
+        )
+        try:
+            page_stats = generate_pages_recursive(
+                self.paths["content"],
+                self.paths["template"],
+                self.paths["public"],
+                self.manifest,
+                jobs,
+                self.cache,
+                changes=changes,
+            )
+        finally:
+            save_manifest(self.manifest_path, self.manifest)
+        return {"static": static_stats, "pages": page_stats}
+
+    def rebuild(self, changed):
+        """Method to rebuild only what a list of changed source paths affects,
+        as watch does, returning the number of outputs touched"""
+        try:
+            return apply_changes(
+                {self.source_path(path) for path in changed}, self.paths, self.manifest
+            )
+        finally:
+            save_manifest(self.manifest_path, self.manifest)
+
+    def source_path(self, path):
+        """Method that respells a path under the content or static directory the
+        way the manifest does, so "content/a.md" matches "./content/a.md" """
+        for root in (self.paths["content"], self.paths["static"]):
+            rel_path = os.path.relpath(path, root)
+            if rel_path == os.curdir:
+                return root
+            if rel_path != os.pardir and not rel_path.startswith(os.pardir + os.sep):
+                return os.path.join(root, rel_path)
+        return os.path.normpath(path)
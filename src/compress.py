@@ -0,0 +1,158 @@
+"""Module to write precompressed variants of text outputs for static file servers"""
+
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import AtomicOutput, remove_output
+
+COMPRESSIBLE_EXTENSIONS = frozenset(
+    (".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml")
+)
+MIN_SIZE = 1024
+
+
+def gzip_compress(data):
+    """Function that gzips bytes with a fixed header mtime, so unchanged input gives identical output"""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def find_zstd_compress():
+    """Function that returns a zstd compression function from the standard
+    library or the zstandard package, or None when neither is available"""
+    try:
+        from compression import zstd  # pylint: disable=import-outside-toplevel
+
+        return lambda data: zstd.compress(data, level=19)
+    except ImportError:
+        pass
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+
+        return zstandard.ZstdCompressor(level=19).compress
+    except ImportError:
+        return None
+
+
+ENCODINGS = {".gz": gzip_compress}
+ZSTD_COMPRESS = find_zstd_compress()
+if ZSTD_COMPRESS is not None:
+    ENCODINGS[".zst"] = ZSTD_COMPRESS
+
+
+def is_compressible(path, size, min_size=MIN_SIZE):
+    """Function that checks whether a file is worth precompressing"""
+    return size >= min_size and os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS
+
+
+def precompress_dir(root, manifest=None, jobs=None, min_size=MIN_SIZE, changes=None):
+    """Function to write a compressed sibling, such as index.html.gz, for every
+    text file under root of at least min_size bytes.
+
+    Files are compressed by a pool of jobs threads, one file per task, since
+    zlib releases the GIL while it works. With jobs None the pool is sized from
+    the CPU count. With a manifest, files whose size and mtime
+    match the last run and whose variants still exist are skipped, and variants
+    of files that are gone or no longer qualify are removed. When a changes list
+    is given, ("M", path) or ("D", path) is appended for every variant written
+    or removed. Returns a dictionary counting the compressed, skipped and
+    removed files, with the bytes saved by each encoding over every variant."""
+    stats = {
+        "compressed": 0,
+        "skipped": 0,
+        "removed": 0,
+        "saved": dict.fromkeys(ENCODINGS, 0),
+    }
+    old_entries = manifest["compressed"] if manifest is not None else {}
+    new_entries = {}
+    pending = []
+    for dir_path, _, files in os.walk(root):
+        for file in files:
+            path = os.path.join(dir_path, file)
+            stat = os.stat(path)
+            if not is_compressible(path, stat.st_size, min_size):
+                continue
+            rel_path = os.path.relpath(path, root)
+            source = [stat.st_size, stat.st_mtime_ns]
+            entry = old_entries.get(rel_path)
+            if (
+                entry is not None
+                and entry["source"] == source
+                and entry["sizes"].keys() == ENCODINGS.keys()
+                and all(os.path.exists(path + suffix) for suffix in ENCODINGS)
+            ):
+                new_entries[rel_path] = entry
+                stats["skipped"] += 1
+            else:
+                pending.append((path, rel_path, stat))
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for (path, rel_path, stat), sizes in zip(
+                pending,
+                pool.map(
+                    compress_file,
+                    [item[0] for item in pending],
+                    [item[2] for item in pending],
+                ),
+            ):
+                new_entries[rel_path] = {
+                    "source": [stat.st_size, stat.st_mtime_ns],
+                    "sizes": sizes,
+                }
+                if changes is not None:
+                    changes.extend(("M", path + suffix) for suffix in sizes)
+    stats["compressed"] = len(pending)
+
+    for rel_path, entry in old_entries.items():
+        kept = new_entries[rel_path]["sizes"] if rel_path in new_entries else {}
+        for suffix in entry["sizes"].keys() - kept.keys():
+            variant = os.path.join(root, rel_path + suffix)
+            if os.path.exists(variant):
+                remove_output(variant, root)
+                if changes is not None:
+                    changes.append(("D", variant))
+        if rel_path not in new_entries:
+            stats["removed"] += 1
+    for entry in new_entries.values():
+        for suffix, size in entry["sizes"].items():
+            stats["saved"][suffix] += entry["source"][0] - size
+    if manifest is not None:
+        manifest["compressed"] = new_entries
+    return stats
+
+
+def remove_precompressed(root, manifest, changes=None):
+    """Function to delete every variant an earlier run recorded in the manifest,
+    for builds with precompression turned off, appending ("D", path) to changes
+    for each one removed. Returns the number of source files whose variants
+    were removed."""
+    entries = manifest["compressed"]
+    for rel_path, entry in entries.items():
+        for suffix in entry["sizes"]:
+            variant = os.path.join(root, rel_path + suffix)
+            if os.path.exists(variant):
+                remove_output(variant, root)
+                if changes is not None:
+                    changes.append(("D", variant))
+    removed = len(entries)
+    manifest["compressed"] = {}
+    return removed
+
+
+def compress_file(path, stat):
+    """Function to write every compressed variant of one file, returning a
+    {suffix: compressed size} dictionary. Variants are written through
+    AtomicOutput and given the source's mtime, which the server checks before
+    serving them."""
+    with open(path, "rb") as f:
+        data = f.read()
+    sizes = {}
+    for suffix, compress in ENCODINGS.items():
+        variant = path + suffix
+        compressed = compress(data)
+        with AtomicOutput(variant) as out:
+            out.write_bytes(compressed)
+        os.utime(variant, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        sizes[suffix] = len(compressed)
+    return sizes
@@ -2,18 +2,120 @@
 
 import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from fileindex import scan_tree
+from manifest import hash_file, remove_output
 
-def copy_static_dir(src, dest):
-    """Function to recursively copy a src directory to a destination directory"""
-    dir_list = os.listdir(src)
-    for file in dir_list:
-        file_path = os.path.join(src, file)
-        if not os.path.isfile(file_path):
-            new_dir = os.path.join("public/", file)
-            print(f"***** Creating --> {new_dir} directory *****")
-            os.mkdir(new_dir)
-            copy_static_dir(file_path, new_dir)
-        if os.path.isfile(file_path):
-            print(f"***** Copying --> {file_path} to {dest} directory *****")
-            shutil.copy(file_path, dest)
+
+def list_static_files(src):
+    """Function that returns a {relative path: FileEntry} dictionary of the files under src"""
+    return {file.rel_path: file for file in scan_tree(src).values()}
+
+
+def sync_static_dir(
+    src, dest, manifest=None, jobs=None, link=False, check_hash=False, changes=None
+):
+    """Function to bring a destination directory in line with a src directory.
+
+    Files whose size and mtime already match the destination are skipped, or,
+    with check_hash, whose contents hash the same. The rest are copied by a pool
+    of threads, or hard linked when link is set and the filesystem allows it.
+    When a manifest is given, files synced by an earlier run that no longer
+    exist in src are removed from the destination. When a changes list is given,
+    ("M", path) is appended for every file copied and ("D", path) for every file
+    removed. Returns a dictionary counting the copied, skipped and removed files."""
+    stats = {"copied": 0, "skipped": 0, "removed": 0}
+    files = list_static_files(src)
+    pending = []
+    for rel_path, file in files.items():
+        dest_path = os.path.join(dest, rel_path)
+        if is_up_to_date(file, dest_path, check_hash):
+            stats["skipped"] += 1
+        else:
+            pending.append((file, dest_path))
+
+    for file, dest_path in pending:
+        print(f"***** Copying --> {file.path} to {dest_path} *****")
+    if pending:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for _ in pool.map(sync_file, *zip(*pending), [link] * len(pending)):
+                pass
+    stats["copied"] = len(pending)
+    if changes is not None:
+        changes.extend(("M", dest_path) for _, dest_path in pending)
+
+    if manifest is not None:
+        for rel_path in manifest["static"]:
+            if rel_path not in files:
+                print(f"***** Removing --> {os.path.join(dest, rel_path)} *****")
+                remove_output(os.path.join(dest, rel_path), dest)
+                if changes is not None:
+                    changes.append(("D", os.path.join(dest, rel_path)))
+                stats["removed"] += 1
+        manifest["static"] = {
+            rel_path: [file.size, file.mtime_ns] for rel_path, file in files.items()
+        }
+    return stats
+
+
+def is_up_to_date(file, dest_path, check_hash=False):
+    """Function that checks whether a destination file already matches its source FileEntry"""
+    try:
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return False
+    if dest_stat.st_size != file.size:
+        return False
+    if dest_stat.st_mtime_ns == file.mtime_ns:
+        return True
+    return check_hash and hash_file(file.path) == hash_file(dest_path)
+
+
+def sync_file(file, dest_path, link=False):
+    """Function to copy or hard link one file into place, preserving its mtime so
+    later syncs can skip it. The new file is written beside the destination and
+    renamed over it, so a destination hard linked to its source is never written
+    through."""
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.sync-tmp"
+    if link:
+        try:
+            os.link(file.path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    with open(file.path, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+        copy_file_contents(fsrc, fdst, file.size)
+    os.utime(tmp_path, ns=(time.time_ns(), file.mtime_ns))
+    os.replace(tmp_path, dest_path)
+
+
+def copy_file_contents(fsrc, fdst, size):
+    """Function to copy between two open files in the kernel where possible,
+    using copy_file_range, then sendfile, then a plain buffered copy"""
+    src_fd, dest_fd = fsrc.fileno(), fdst.fileno()
+    for kernel_copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if kernel_copy is None:
+            continue
+        copied = 0
+        try:
+            while copied < size:
+                if kernel_copy is os.sendfile:
+                    sent = os.sendfile(dest_fd, src_fd, copied, size - copied)
+                else:
+                    sent = os.copy_file_range(src_fd, dest_fd, size - copied, copied, copied)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError:
+            continue
+        if copied == size:
+            return
+    fsrc.seek(0)
+    fdst.seek(0)
+    fdst.truncate()
+    shutil.copyfileobj(fsrc, fdst)
@@ -0,0 +1,209 @@
+"""Module to serve a Builder to other processes over local HTTP or a Unix socket"""
+
+# pylint: disable=line-too-long
+
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from block_markdown import BLOCK_CACHE
+
+LATENCY_WINDOW = 10000
+
+
+class LatencyRecorder:
+    """Class keeping the latencies of the most recent requests to each endpoint,
+    up to window of them, with the total count of requests ever seen"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Method to add the latency of one request"""
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.counts[name] = 0
+            self.samples[name].append(seconds)
+            self.counts[name] += 1
+
+    def stats(self):
+        """Method that returns the request count and the p50, p90, p99 and max
+        latencies in milliseconds of each endpoint"""
+        with self.lock:
+            snapshot = {name: (self.counts[name], sorted(samples)) for name, samples in self.samples.items()}
+        return {
+            name: {
+                "count": count,
+                "p50": percentile(samples, 0.50) * 1000,
+                "p90": percentile(samples, 0.90) * 1000,
+                "p99": percentile(samples, 0.99) * 1000,
+                "max": samples[-1] * 1000,
+            }
+            for name, (count, samples) in snapshot.items()
+        }
+
+
+def percentile(values, fraction):
+    """Function that returns the value below which a fraction of sorted values fall"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """Class answering the requests of the render daemon:
+
+    POST /render  markdown body, answered with its html content
+    POST /page    markdown body, answered with it rendered into the template
+    POST /rebuild {"paths": [...]} body, rebuilds what the paths affect
+    GET  /stats   request latencies and cache statistics as json
+
+    Requests are timed from the end of their headers to the end of their
+    response. Builder calls are serialized by a lock shared by the server."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    builder = None
+    lock = threading.Lock()
+    latencies = LatencyRecorder()
+    started = time.monotonic()
+    access_log = False
+
+    def do_GET(self):
+        self.dispatch({"/stats": self.stats})
+
+    def do_POST(self):
+        self.dispatch({"/render": self.render, "/page": self.render_page, "/rebuild": self.rebuild})
+
+    def dispatch(self, routes):
+        """Method to run the route for the request path and record its latency"""
+        start = time.perf_counter()
+        path = urlsplit(self.path).path
+        route = routes.get(path)
+        if route is None:
+            # The body is left unread, so the connection cannot carry another request
+            self.close_connection = True
+            self.send_error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+            return
+        try:
+            status, content_type, body = route()
+        except (ValueError, UnicodeDecodeError) as err:
+            status, content_type, body = HTTPStatus.BAD_REQUEST, "text/plain", str(err)
+        except (OSError, RuntimeError, SyntaxError) as err:
+            status, content_type, body = HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain", str(err)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.latencies.record(path, time.perf_counter() - start)
+
+    def read_body(self):
+        """Method that returns the request body decoded as utf-8"""
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8")
+
+    def render(self):
+        """Method answering POST /render"""
+        markdown = self.read_body()
+        with self.lock:
+            return HTTPStatus.OK, "text/html", self.builder.renderer.render(markdown)
+
+    def render_page(self):
+        """Method answering POST /page"""
+        markdown = self.read_body()
+        with self.lock:
+            return HTTPStatus.OK, "text/html", self.builder.renderer.render_page(markdown)
+
+    def rebuild(self):
+        """Method answering POST /rebuild"""
+        request = json.loads(self.read_body() or "{}")
+        paths = request.get("paths") if isinstance(request, dict) else None
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            raise ValueError('Expected a body of {"paths": [...]}')
+        start = time.perf_counter()
+        with self.lock:
+            touched = self.builder.rebuild(paths)
+        elapsed = (time.perf_counter() - start) * 1000
+        return HTTPStatus.OK, "application/json", json.dumps({"touched": touched, "ms": elapsed})
+
+    def stats(self):
+        """Method answering GET /stats"""
+        cache = self.builder.cache
+        stats = {
+            "uptime": time.monotonic() - self.started,
+            "endpoints": self.latencies.stats(),
+            "block_cache": BLOCK_CACHE.stats(),
+            "parse_cache": None if cache is None else {"hits": cache.hits, "misses": cache.misses},
+        }
+        return HTTPStatus.OK, "application/json", json.dumps(stats, indent=1)
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """Class running each connection to the local HTTP port on its own thread"""
+
+    daemon_threads = True
+
+
+class UnixDaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Class running each connection to the Unix socket on its own thread"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+
+def make_daemon(builder, port=8890, socket_path=None, access_log=False, host="127.0.0.1"):
+    """Function that returns a render daemon for a builder, listening on the
+    Unix socket at socket_path when given and on the local port otherwise"""
+    handler_class = type(
+        "BoundDaemonHandler",
+        (DaemonHandler,),
+        {
+            "builder": builder,
+            "lock": threading.Lock(),
+            "latencies": LatencyRecorder(),
+            "started": time.monotonic(),
+            "access_log": access_log,
+            # TCP_NODELAY does not apply to Unix sockets
+            "disable_nagle_algorithm": socket_path is None,
+        },
+    )
+    if socket_path is not None:
+        return UnixDaemonServer(socket_path, handler_class)
+    return DaemonServer((host, port), handler_class)
+
+
+def serve_daemon(builder, port=8890, socket_path=None, access_log=False):
+    """Function to run a render daemon until interrupted"""
+    server = make_daemon(builder, port, socket_path, access_log)
+    where = socket_path if socket_path is not None else f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"***** Render daemon listening on {where} *****")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,78 @@
+"""Module to index source trees in one pass of os.scandir"""
+
+import os
+from collections import namedtuple
+from operator import attrgetter
+
+FileEntry = namedtuple("FileEntry", ["path", "rel_path", "kind", "size", "mtime_ns"])
+
+KIND_MARKDOWN = "markdown"
+KIND_FILE = "file"
+BY_NAME = attrgetter("name")
+
+
+def file_kind(name):
+    """Function that returns the kind of a source file from its name"""
+    return KIND_MARKDOWN if name.endswith(".md") else KIND_FILE
+
+
+def iter_files(root):
+    """Generator that yields a FileEntry for every file under root, depth first
+    in sorted order.
+
+    Directories are told apart by the file type readdir already returned, so
+    the only extra syscall is one stat per file for its size and mtime. The tree
+    is walked with an explicit stack, so only the listing of each directory on
+    the current path is held in memory. Entries removed while the walk is under
+    way are skipped."""
+    new_entry = tuple.__new__
+    stack = [("", _sorted_entries(root))]
+    while stack:
+        prefix, entries = stack[-1]
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir():
+                    stack.append((prefix + name + os.sep, _sorted_entries(entry.path)))
+                    break
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield new_entry(
+                FileEntry,
+                (
+                    entry.path,
+                    prefix + name,
+                    file_kind(name),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ),
+            )
+        else:
+            stack.pop()
+
+
+def _sorted_entries(dir_path):
+    """Function that returns an iterator over a directory's entries sorted by name"""
+    with os.scandir(dir_path) as entries:
+        return iter(sorted(entries, key=BY_NAME))
+
+
+def scan_tree(root):
+    """Function that returns a {path: FileEntry} index of every file under root,
+    in the order iter_files yields them"""
+    return {entry.path: entry for entry in iter_files(root)}
+
+
+def file_entry(path, root):
+    """Function that returns the FileEntry of a single file under root"""
+    stat = os.stat(path)
+    return FileEntry(
+        path,
+        os.path.relpath(path, root),
+        file_kind(os.path.basename(path)),
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
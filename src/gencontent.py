@@ -2,46 +2,596 @@
 
 # pylint: disable=line-too-long
 
+import asyncio
+import contextlib
+import io
 import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from block_markdown import markdown_to_html
+import profiling
+from assets import ASSET_URLS, set_asset_urls
+from block_markdown import markdown_to_html, write_markdown_html
+from fileindex import KIND_MARKDOWN, file_entry, iter_files, scan_tree
+from htmlnode import escape_html
+from manifest import AtomicOutput, hash_file, parser_version, remove_output
+from searchindex import page_url, text_terms
+from template import load_template
 
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    """Recursive function to generate htmls files from markdown files"""
-    dir_list = os.listdir(dir_path_content)
-    for file in dir_list:
-        file_path = os.path.join(dir_path_content, file)
-        if not os.path.isfile(file_path):
-            new_dir = os.path.join(dest_dir_path, file)
-            print(f"***** Creating --> {new_dir} directory *****")
-            os.mkdir(new_dir)
-            generate_pages_recursive(
-                file_path, template_path, os.path.join(dest_dir_path, file)
+def find_pages(dir_path_content, dest_dir_path, files=None):
+    """Function that returns a list of (markdown path, html path) pairs for every page"""
+    return [
+        (file.path, dest_path)
+        for file, dest_path in iter_pages(dir_path_content, dest_dir_path, files)
+    ]
+
+
+def iter_pages(dir_path_content, dest_dir_path, files=None):
+    """Generator that yields a (FileEntry, html path) pair for every markdown
+    file, depth first in sorted order. files is an index from scan_tree; without
+    one the tree is scanned lazily with iter_files."""
+    if files is None:
+        files = iter_files(dir_path_content)
+    else:
+        files = files.values()
+    for file in files:
+        if file.kind == KIND_MARKDOWN:
+            yield file, os.path.join(dest_dir_path, os.path.dirname(file.rel_path), "index.html")
+
+
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    """Function that returns the html path a markdown file under dir_path_content is generated to"""
+    rel_dir = os.path.relpath(os.path.dirname(from_path), dir_path_content)
+    if rel_dir == os.curdir:
+        return os.path.join(dest_dir_path, "index.html")
+    return os.path.join(dest_dir_path, rel_dir, "index.html")
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest=None,
+    jobs=1,
+    cache=None,
+    io_depth=0,
+    changes=None,
+    stream=False,
+    search=None,
+):
+    """Function to generate html files from markdown files.
+
+    When a manifest is given only pages whose source, template or parser changed
+    are regenerated, and pages whose source was deleted are removed. With jobs
+    greater than 1 the pages are rendered in a pool of that many processes. A
+    ParseCache, when given, supplies the content of pages parsed by earlier runs.
+    An io_depth above 0 overlaps reads and writes with rendering, see
+    generate_pages_async. Pages whose rendered html is unchanged are left
+    untouched. When a changes list is given, ("M", path) is appended for every
+    output written and ("D", path) for every output removed. With stream set,
+    jobs, cache and io_depth are ignored and stream_pages_recursive does the
+    work in bounded memory. A SearchIndex, when given, is brought up to date
+    with the title and words of every page, collected as pages are rendered;
+    pages it holds no current record of are regenerated. Returns a dictionary
+    counting the generated, skipped and removed pages."""
+    if stream:
+        return stream_pages_recursive(
+            dir_path_content, template_path, dest_dir_path, manifest, changes, search
+        )
+    stats = {"generated": 0, "skipped": 0, "removed": 0}
+    profiler = profiling.ACTIVE
+    if profiler is not None:
+        with profiler.span("discover pages", "build"):
+            files = scan_tree(dir_path_content)
+    else:
+        files = scan_tree(dir_path_content)
+    page_files = list(iter_pages(dir_path_content, dest_dir_path, files))
+    pages = [(file.path, dest_path) for file, dest_path in page_files]
+    if manifest is None:
+        results = generate_pages(
+            pages, template_path, jobs, cache, io_depth, index_text=search is not None
+        )
+        record_changes(pages, results, changes)
+        if search is not None:
+            for (from_path, dest_path), (_, _, document) in zip(pages, results):
+                search.update(from_path, None, page_url(dest_path, dest_dir_path), document)
+            search.retain(page[0] for page in pages)
+        stats["generated"] = len(pages)
+        return stats
+
+    template_hash = load_template(template_path).digest
+    version = parser_version()
+    rebuild_all = manifest["template"] != template_hash or manifest["parser"] != version
+    old_pages = manifest["pages"]
+    new_pages = {}
+    dirty_pages = []
+    hash_start = time.perf_counter_ns()
+    for file, dest_path in page_files:
+        entry = new_pages[file.path] = page_entry(file, dest_path, old_pages)
+        if (
+            not rebuild_all
+            and is_page_current(entry, old_pages.get(file.path))
+            and (search is None or search.is_current(file.path, entry["hash"]))
+        ):
+            stats["skipped"] += 1
+            continue
+        dirty_pages.append((file.path, dest_path))
+    if profiler is not None:
+        profiler.add("hash sources", "build", hash_start, time.perf_counter_ns())
+    for from_path, _ in dirty_pages:
+        invalidate_page(old_pages, from_path)
+    results = generate_pages(
+        dirty_pages,
+        template_path,
+        jobs,
+        cache,
+        io_depth,
+        {dest: new_pages[src]["output"] for src, dest in dirty_pages},
+        search is not None,
+    )
+    for (from_path, dest_path), (output, _, document) in zip(dirty_pages, results):
+        entry = new_pages[from_path]
+        entry["output"] = output
+        if search is not None:
+            search.update(from_path, entry["hash"], page_url(dest_path, dest_dir_path), document)
+    if search is not None:
+        search.retain(new_pages)
+    record_changes(dirty_pages, results, changes)
+    stats["generated"] = len(dirty_pages)
+    stats["removed"] = remove_stale_pages(old_pages, new_pages, dest_dir_path, changes)
+
+    manifest["template"] = template_hash
+    manifest["parser"] = version
+    manifest["pages"] = new_pages
+    return stats
+
+
+def stream_pages_recursive(
+    dir_path_content, template_path, dest_dir_path, manifest=None, changes=None, search=None
+):
+    """Function doing the work of generate_pages_recursive in bounded memory.
+
+    Pages are discovered lazily by iter_pages and each page is rendered and
+    written before the next one is found. Sources are read line by line and
+    rendered block by block straight into the output, so no page is held in
+    memory whole. Only the manifest and the search index grow with the number
+    of pages, by one small entry each. Pages are built serially."""
+    stats = {"generated": 0, "skipped": 0, "removed": 0}
+    template_hash = load_template(template_path).digest
+    version = parser_version()
+    old_pages = manifest["pages"] if manifest is not None else {}
+    rebuild_all = (
+        manifest is None
+        or manifest["template"] != template_hash
+        or manifest["parser"] != version
+    )
+    new_pages = {}
+    for file, dest_path in iter_pages(dir_path_content, dest_dir_path):
+        from_path = file.path
+        entry = new_pages[from_path] = page_entry(file, dest_path, old_pages)
+        if (
+            not rebuild_all
+            and is_page_current(entry, old_pages.get(from_path))
+            and (search is None or search.is_current(from_path, entry["hash"]))
+        ):
+            stats["skipped"] += 1
+            continue
+        invalidate_page(old_pages, from_path)
+        with page_errors(from_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            entry["output"], changed, document = stream_page(
+                from_path, template_path, dest_path, entry["output"], search is not None
             )
-        if os.path.isfile(file_path):
-            generate_page(
-                os.path.join(dir_path_content, file),
-                template_path,
-                os.path.join(dest_dir_path, "index.html"),
+        if changed and changes is not None:
+            changes.append(("M", dest_path))
+        if search is not None:
+            search.update(from_path, entry["hash"], page_url(dest_path, dest_dir_path), document)
+        stats["generated"] += 1
+    if search is not None:
+        search.retain(new_pages)
+    if manifest is None:
+        return stats
+    stats["removed"] = remove_stale_pages(old_pages, new_pages, dest_dir_path, changes)
+    manifest["template"] = template_hash
+    manifest["parser"] = version
+    manifest["pages"] = new_pages
+    return stats
+
+
+def stream_page(from_path, template_path, dest_path, old_output=None, index_text=False):
+    """Function to generate an html file from a markdown file one block at a
+    time, reading the title from the first line. Returns the output hash,
+    whether the file changed and, with index_text set, the page's search
+    document, counted line by line as the source streams past. When profiling,
+    a span is recorded for the page, and write_markdown_html records the read,
+    render and write spans of each block."""
+    announce_page(from_path, dest_path, template_path)
+    profiler = profiling.ACTIVE
+    start = time.perf_counter_ns()
+    template = load_template(template_path)
+    terms = None
+    with open(from_path, "r", encoding="utf-8") as f:
+        first_line = f.readline().rstrip("\n")
+        f.seek(0)
+        lines = f
+        if index_text:
+            terms = Counter()
+            lines = counted_lines(f, terms)
+        with AtomicOutput(dest_path, old_output) as out:
+            title = fill_template(
+                out, template, first_line, lambda fp: write_markdown_html(lines, fp)
             )
+    if profiler is not None:
+        profiler.add("page", "page", start, time.perf_counter_ns(), {"source": from_path})
+    return out.digest, out.changed, (title, terms) if index_text else None
 
 
-def generate_page(from_path, template_path, dest_path):
-    """Function to generate an html file from a markdown file"""
-    print(
-        f"***** Generating page from {from_path} --> {dest_path} using {template_path} *****"
+def counted_lines(lines, terms):
+    """Generator that yields lines unchanged after counting their words into terms"""
+    for line in lines:
+        text_terms(line, terms)
+        yield line
+
+
+def page_entry(file, dest_path, old_pages):
+    """Function that returns the manifest entry of a page from its FileEntry.
+    The source is hashed only when its size or mtime changed since the last
+    build, and the hash of the previous output is carried over when the page
+    is generated to the same place."""
+    old_entry = old_pages.get(file.path, {})
+    stat = [file.size, file.mtime_ns]
+    return {
+        "hash": old_entry["hash"] if old_entry.get("stat") == stat else hash_file(file.path),
+        "dest": dest_path,
+        "output": old_entry.get("output") if old_entry.get("dest") == dest_path else None,
+        "stat": stat,
+    }
+
+
+def invalidate_page(pages, from_path):
+    """Function to mark a page's manifest entry as not describing its output
+    before the page is regenerated. A build that fails after writing the page
+    may still save the manifest, and the page must not then pass for current
+    when its source goes back to the contents the entry was made from."""
+    entry = pages.get(from_path)
+    if entry is not None:
+        entry["hash"] = entry["stat"] = entry["output"] = None
+
+
+def is_page_current(entry, old_entry):
+    """Function that checks whether a page's source and destination match the
+    last build and its output is still there"""
+    return (
+        old_entry is not None
+        and old_entry.get("hash") == entry["hash"]
+        and old_entry.get("dest") == entry["dest"]
+        and os.path.exists(entry["dest"])
     )
+
+
+def remove_stale_pages(old_pages, new_pages, dest_dir_path, changes=None):
+    """Function to remove the outputs of pages whose source is gone, returning how many were removed"""
+    removed = 0
+    live_outputs = {entry["dest"] for entry in new_pages.values()}
+    for from_path, entry in old_pages.items():
+        if from_path in new_pages or entry["dest"] in live_outputs:
+            continue
+        remove_page(entry["dest"], dest_dir_path)
+        if changes is not None:
+            changes.append(("D", entry["dest"]))
+        removed += 1
+    return removed
+
+
+def record_changes(pages, results, changes):
+    """Function to append ("M", path) to changes for every page whose output was written"""
+    if changes is None:
+        return
+    for (_, dest_path), (_, changed, _) in zip(pages, results):
+        if changed:
+            changes.append(("M", dest_path))
+
+
+def update_page(
+    from_path, dir_path_content, template_path, dest_dir_path, manifest, cache=None
+):
+    """Function to bring a single page and its manifest entry up to date after its
+    source changed, regenerating it or removing its output when the source is gone"""
+    if os.path.isfile(from_path):
+        dest_path = page_dest_path(from_path, dir_path_content, dest_dir_path)
+        entry = page_entry(
+            file_entry(from_path, dir_path_content), dest_path, manifest["pages"]
+        )
+        invalidate_page(manifest["pages"], from_path)
+        entry["output"], _, _ = build_page(
+            from_path, template_path, dest_path, cache, entry["output"]
+        )
+        manifest["pages"][from_path] = entry
+        return
+    prefix = from_path + os.sep
+    for source in list(manifest["pages"]):
+        if source == from_path or source.startswith(prefix):
+            remove_page(manifest["pages"].pop(source)["dest"], dest_dir_path)
+
+
+def generate_pages(
+    pages, template_path, jobs=1, cache=None, io_depth=0, old_outputs=None, index_text=False
+):
+    """Function to generate a list of (markdown path, html path) pages, serially,
+    through the asyncio pipeline when io_depth is set, or across a pool of worker
+    processes. old_outputs maps html paths to the hash of their previous output.
+    Returns an (output hash, changed, search document) triple for each page, in
+    order, where the document is None unless index_text is set."""
+    old_outputs = old_outputs or {}
+    if jobs <= 1 and io_depth > 0 and len(pages) > 1:
+        return generate_pages_async(
+            pages, template_path, io_depth, cache, old_outputs, index_text
+        )
+    if jobs <= 1 or len(pages) <= 1:
+        return [
+            build_page(
+                from_path, template_path, dest_path, cache, old_outputs.get(dest_path), index_text
+            )
+            for from_path, dest_path in pages
+        ]
+    chunksize = max(1, len(pages) // (jobs * 4))
+    profiler = profiling.ACTIVE
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=set_asset_urls, initargs=(ASSET_URLS,)
+    ) as pool:
+        for result in pool.map(
+            build_page if profiler is None else build_page_profiled,
+            [page[0] for page in pages],
+            [template_path] * len(pages),
+            [page[1] for page in pages],
+            [cache] * len(pages),
+            [old_outputs.get(page[1]) for page in pages],
+            [index_text] * len(pages),
+            chunksize=chunksize,
+        ):
+            if profiler is not None:
+                result, events = result
+                profiler.events.extend(events)
+            results.append(result)
+    return results
+
+
+def build_page(
+    from_path, template_path, dest_path, cache=None, old_output=None, index_text=False
+):
+    """Function to generate one page, creating its directory and naming the
+    source file in any error it raises. Returns the result of generate_page."""
+    with page_errors(from_path):
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        return generate_page(
+            from_path, template_path, dest_path, cache, old_output, index_text
+        )
+
+
+def build_page_profiled(
+    from_path, template_path, dest_path, cache=None, old_output=None, index_text=False
+):
+    """Function run in a worker process to build one page with profiling on,
+    returning its result with the recorded trace events to the parent process"""
+    profiler = profiling.start()
+    try:
+        result = build_page(
+            from_path, template_path, dest_path, cache, old_output, index_text
+        )
+    finally:
+        profiling.stop()
+    return result, profiler.events
+
+
+def remove_page(dest_path, dest_dir_path):
+    """Function to delete a generated page and any directories it leaves empty"""
+    print(f"***** Removing --> {dest_path} *****")
+    remove_output(dest_path, dest_dir_path)
+
+
+def generate_page(
+    from_path, template_path, dest_path, cache=None, old_output=None, index_text=False
+):
+    """Function to generate an html file from a markdown file, leaving the file
+    untouched when its contents hash to old_output. Returns the output hash,
+    whether the file changed and, with index_text set, the page's search
+    document as a (title, term counts) pair, or None otherwise."""
+    announce_page(from_path, dest_path, template_path)
+    if profiling.ACTIVE is not None:
+        return profiled_generate_page(
+            from_path, template_path, dest_path, profiling.ACTIVE, cache, old_output, index_text
+        )
     with open(from_path, "r", encoding="utf-8") as f:
         md = f.read()
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = f.read()
-    html = markdown_to_html(md).to_html()
-    title = extract_title(md)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(template)
+    template = load_template(template_path)
+    node = content_html(md, cache)
+    with AtomicOutput(dest_path, old_output) as out:
+        title = fill_template(out, template, md, node)
+    return out.digest, out.changed, (title, text_terms(md)) if index_text else None
+
+
+def profiled_generate_page(
+    from_path, template_path, dest_path, profiler, cache=None, old_output=None, index_text=False
+):
+    """Function doing the work of generate_page while recording a span for the
+    page and one for each stage. Serialization goes to a buffer first so its
+    time is reported apart from the write."""
+    with profiler.span("page", "page", source=from_path):
+        with profiler.span("read", "stage"):
+            with open(from_path, "r", encoding="utf-8") as f:
+                md = f.read()
+        with profiler.span("load_template", "stage"):
+            template = load_template(template_path)
+        with profiler.span("markdown_to_html", "stage"):
+            node = content_html(md, cache)
+        with profiler.span("serialize", "stage"):
+            buffer = io.StringIO()
+            title = fill_template(buffer, template, md, node)
+        with profiler.span("write", "stage"):
+            with AtomicOutput(dest_path, old_output) as out:
+                out.write(buffer.getvalue())
+        document = None
+        if index_text:
+            with profiler.span("text_terms", "stage"):
+                document = (title, text_terms(md))
+    return out.digest, out.changed, document
+
+
+def generate_pages_async(
+    pages, template_path, io_depth, cache=None, old_outputs=None, index_text=False
+):
+    """Function to generate pages with disk I/O overlapped with rendering.
+
+    Rendering stays on one thread in page order, so output and log lines match
+    the sequential path. Up to io_depth upcoming sources are read ahead and up
+    to io_depth finished pages are written behind it by a pool of I/O threads,
+    which hides most of the latency of slow or network filesystems. Returns the
+    same triples as generate_pages, in order."""
+    return asyncio.run(
+        _generate_pages_async(
+            pages, template_path, io_depth, cache, old_outputs or {}, index_text
+        )
+    )
+
+
+async def _generate_pages_async(pages, template_path, io_depth, cache, old_outputs, index_text):
+    """Coroutine running the read, render and write stages of generate_pages_async"""
+    loop = asyncio.get_running_loop()
+    template = load_template(template_path)
+    reads = asyncio.Queue(maxsize=io_depth)
+    write_slots = asyncio.Semaphore(io_depth)
+    writes = []
+    documents = []
+
+    async def prefetch():
+        for from_path, dest_path in pages:
+            read = loop.run_in_executor(pool, read_page_source, from_path, cache)
+            await reads.put((from_path, dest_path, read))
+
+    with ThreadPoolExecutor(max_workers=2 * io_depth) as pool:
+        producer = asyncio.create_task(prefetch())
+        try:
+            for _ in pages:
+                from_path, dest_path, read = await reads.get()
+                announce_page(from_path, dest_path, template_path)
+                with page_errors(from_path):
+                    md, html = await read
+                    page, html, title = render_page(md, html, template, cache, from_path)
+                    documents.append((title, text_terms(md)) if index_text else None)
+                await write_slots.acquire()
+                write = loop.run_in_executor(
+                    pool,
+                    write_page,
+                    from_path,
+                    dest_path,
+                    page,
+                    old_outputs.get(dest_path),
+                    md,
+                    html,
+                    cache,
+                )
+                write.add_done_callback(lambda _: write_slots.release())
+                writes.append(write)
+            results = await asyncio.gather(*writes)
+            return [
+                (output, changed, document)
+                for (output, changed), document in zip(results, documents)
+            ]
+        finally:
+            producer.cancel()
+            while not reads.empty():
+                reads.get_nowait()[2].cancel()
+
+
+def read_page_source(from_path, cache=None):
+    """Function run on an I/O thread that returns a page's markdown and its
+    cached html, or None when there is no cache entry"""
+    profiler = profiling.ACTIVE
+    start = time.perf_counter_ns()
+    with open(from_path, "r", encoding="utf-8") as f:
+        md = f.read()
+    html = cache.get(md) if cache is not None else None
+    if profiler is not None:
+        profiler.add("read", "stage", start, time.perf_counter_ns())
+    return md, html
+
+
+def render_page(md, html, template, cache, from_path):
+    """Function that fills the template for one page, returning the page text,
+    the content html to store in the parse cache, or None when nothing is to be
+    stored, and the page title"""
+    profiler = profiling.ACTIVE
+    start = time.perf_counter_ns()
+    if html is not None:
+        content, html = html, None
+    elif cache is not None:
+        content = html = markdown_to_html(md).to_html()
+    else:
+        content = markdown_to_html(md)
+    buffer = io.StringIO()
+    title = fill_template(buffer, template, md, content)
+    if profiler is not None:
+        profiler.add("page", "page", start, time.perf_counter_ns(), {"source": from_path})
+    return buffer.getvalue(), html, title
+
+
+def write_page(from_path, dest_path, page, old_output, md, html, cache=None):
+    """Function run on an I/O thread to write a rendered page unless it hashes to
+    old_output, and store its content in the parse cache when it was freshly
+    parsed. Returns the output hash and whether the file changed."""
+    profiler = profiling.ACTIVE
+    start = time.perf_counter_ns()
+    with page_errors(from_path):
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with AtomicOutput(dest_path, old_output) as out:
+            out.write(page)
+        if html is not None:
+            cache.put(md, html)
+    if profiler is not None:
+        profiler.add("write", "stage", start, time.perf_counter_ns())
+    return out.digest, out.changed
+
+
+def announce_page(from_path, dest_path, template_path):
+    """Function to log that a page is being generated"""
+    print(
+        f"***** Generating page from {from_path} --> {dest_path} using {template_path} *****"
+    )
+
+
+@contextlib.contextmanager
+def page_errors(from_path):
+    """Context manager that re-raises any error from generating a page as a
+    RuntimeError naming its source file"""
+    try:
+        yield
+    except Exception as err:
+        raise RuntimeError(f"Failed to generate page from {from_path}: {err!r}") from err
+
+
+def fill_template(fp, template, markdown, content):
+    """Function that writes a page to fp by filling the template with the title
+    from the H1 that begins the markdown, escaped like the H1 itself, and with
+    the content, which is anything the template accepts as a value. Returns the
+    title unescaped."""
+    title = extract_title(markdown)
+    template.render(fp, {"Title": escape_html(title), "Content": content})
+    return title
+
+
+def content_html(markdown, cache=None):
+    """Function that returns the html content of a page, as a node freshly parsed
+    from the markdown or as a string taken from the parse cache"""
+    if cache is None:
+        return markdown_to_html(markdown)
+    html = cache.get(markdown)
+    if html is None:
+        html = markdown_to_html(markdown).to_html()
+        cache.put(markdown, html)
+    return html
 
 
 def extract_title(markdown):
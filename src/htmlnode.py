@@ -1,9 +1,28 @@
 """This module implements the classes used to process inputs to html."""
 
+from types import MappingProxyType
+from weakref import WeakValueDictionary
+
+
+def escape_html(text, quote=False):
+    """Function that escapes the characters html gives meaning to in text, and
+    double quotes too when quote is set, for attribute values.
+
+    Each character is replaced by a separate str.replace, which scans in C and
+    returns the string itself when the character is absent. A str.translate
+    table was measured about ten times slower on code, as translate leaves its
+    fast path for any replacement longer than one character."""
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if quote:
+        return text.replace('"', "&quot;")
+    return text
+
 
 class HTMLNode:
     """Class for building html nodes"""
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -16,13 +35,23 @@ class HTMLNode:
             "to_html can only be called on child classes of HTMLNode"
         )
 
+    def iter_html(self):
+        """Method that yields the html output in chunks. Overridden in ParentNode."""
+        yield self.to_html()
+
+    def write_html(self, fp):
+        """Method that streams the html output to a file-like object with a write method"""
+        write = fp.write
+        for chunk in self.iter_html():
+            write(chunk)
+
     def props_to_html(self):
-        """Method for processing the props dictionary into appropriate html output"""
+        """Method for processing the props dictionary into appropriate html output.
+        Values are escaped and double quoted."""
         if self.props is not None:
-            html = ""
-            for key, value in self.props.items():
-                html += f" {key}={value}"
-            return html
+            return "".join(
+                [f' {key}="{escape_html(str(value), True)}"' for key, value in self.props.items()]
+            )
         return ""
 
     def __repr__(self):
@@ -32,6 +61,8 @@ class HTMLNode:
 class LeafNode(HTMLNode):
     """Class to process an HTMLNode that has can't have children."""
 
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag, value, None, props)
 
@@ -51,16 +82,136 @@ class LeafNode(HTMLNode):
 class ParentNode(HTMLNode):
     """Class for processing HTMLNodes that must have children."""
 
+    __slots__ = ()
+
     def __init__(self, tag=None, children=None, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
-        result = f"<{self.tag}>"
-        if self.tag is None:
-            raise ValueError("tag property is required")
-        if self.children is None:
-            raise ValueError("children property is required")
-        result = ""
-        for child in self.children:
-            result += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{result}</{self.tag}>"
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        """Method that yields the html output in chunks. The tree is walked with an
+        explicit stack, so output is linear in its size and deep trees can't hit the
+        recursion limit."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                if node.tag is None:
+                    raise ValueError("tag property is required")
+                if node.children is None:
+                    raise ValueError("children property is required")
+                yield f"<{node.tag}{node.props_to_html()}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.to_html()
+
+
+class FrozenNode(HTMLNode):
+    """Class for an immutable html node whose html is serialized once, when it is
+    built by freeze, and returned as is by every to_html call after that.
+
+    Its children are FrozenNodes held in a tuple and its props are a read-only
+    mapping, so nothing under it can change and its html never goes stale.
+    Assigning to any attribute raises AttributeError."""
+
+    __slots__ = ("html", "__weakref__")
+
+    def __init__(self, tag, value, children, props, html):  # pylint: disable=super-init-not-called
+        for name, attr in (
+            ("tag", tag),
+            ("value", value),
+            ("children", children),
+            ("props", props),
+            ("html", html),
+        ):
+            object.__setattr__(self, name, attr)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"FrozenNode is immutable, can't set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"FrozenNode is immutable, can't delete {name}")
+
+    def to_html(self):
+        return self.html
+
+    def __repr__(self):
+        return f"FrozenNode{self.tag, self.value, self.children, self.props}"
+
+
+# Frozen nodes by structure: (class, tag, value, props, ids of frozen children),
+# with the class in the key as subclasses may serialize differently. Children
+# are interned before their parents, so identical subtrees have the same key and
+# share one node and one html string. Values are held weakly: an entry lives only
+# as long as some tree, such as a BlockCache entry, uses its node, and a parent
+# keeps its children alive, so the ids in a live key can't be reused.
+FROZEN_NODES = WeakValueDictionary()
+
+
+def freeze(node):
+    """Function that returns a FrozenNode copy of a node tree, with the html of
+    every subtree serialized once and identical subtrees shared.
+
+    The nodes passed in are left alone and stay mutable: changing them later has
+    no effect on the copy, and freezing them again gives a copy of their new
+    state. FrozenNodes found in the tree are reused as they are. The tree is
+    walked with an explicit stack, like ParentNode.iter_html.
+
+    Every node keeps the html of its whole subtree, so a frozen tree takes
+    memory in proportion to its size times its depth. It suits shallow trees
+    such as rendered blocks, not whole documents."""
+    if isinstance(node, FrozenNode):
+        return node
+    frozen = {}
+    stack = [(node, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if isinstance(current, FrozenNode) or id(current) in frozen:
+            continue
+        if not isinstance(current, ParentNode):
+            frozen[id(current)] = intern_node(current, None)
+        elif expanded:
+            children = tuple(
+                child if isinstance(child, FrozenNode) else frozen[id(child)]
+                for child in current.children
+            )
+            frozen[id(current)] = intern_node(current, children)
+        else:
+            if current.tag is None:
+                raise ValueError("tag property is required")
+            if current.children is None:
+                raise ValueError("children property is required")
+            stack.append((current, True))
+            stack.extend((child, False) for child in current.children)
+    return frozen[id(node)]
+
+
+def intern_node(node, children):
+    """Function that returns the shared FrozenNode for a node given its frozen
+    children, or None for a leaf, serializing it only when no identical node
+    was frozen before"""
+    props = None if node.props is None else tuple(node.props.items())
+    key = (
+        type(node),
+        node.tag,
+        node.value,
+        props,
+        None if children is None else tuple(map(id, children)),
+    )
+    shared = FROZEN_NODES.get(key)
+    if shared is not None:
+        return shared
+    if children is None:
+        html = node.to_html()
+    else:
+        tag = node.tag
+        html = f"<{tag}{node.props_to_html()}>{''.join([child.html for child in children])}</{tag}>"
+    shared = FROZEN_NODES[key] = FrozenNode(
+        node.tag, node.value, children, None if props is None else MappingProxyType(dict(props)), html
+    )
+    return shared
@@ -4,6 +4,14 @@ import re
 
 from textnode import TextNode
 
+# Code, bold and italic are matched by one alternation, tried left to right at
+# each position. The character classes keep a match from swallowing a delimiter
+# that the old pass-per-type pipeline would have split on first: code and bold
+# can't contain a backtick and italic can't contain * or `.
+DELIMITED_MARKUP = re.compile(r"`([^`]*)`|\*\*([^`]*?)\*\*|\*([^*`]+)\*")
+IMAGE_MARKUP = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_MARKUP = re.compile(r"\[(.*?)\]\((.*?)\)")
+
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     """Function that takes a list of TextNodes, a delimiter, and a text type
@@ -79,11 +87,69 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
-def text_to_textnodes(text):
-    """Function to convert text to TextNodes, takes a string and returns a list of TextNodes"""
-    text_nodes = split_nodes_delimiter([TextNode(text, "text")], "`", "code")
-    text_nodes = split_nodes_delimiter(text_nodes, "**", "bold")
-    text_nodes = split_nodes_delimiter(text_nodes, "*", "italic")
-    text_nodes = split_nodes_image(text_nodes)
-    text_nodes = split_nodes_link(text_nodes)
+def text_to_textnodes(text, make_node=TextNode):
+    """Function to convert text to TextNodes, takes a string and returns a list of TextNodes.
+
+    Code, bold and italic spans are found in one regex scan and only the plain
+    text between them is searched for images and then links, so each character
+    is looked at a fixed number of times and no intermediate node lists are built.
+    The result is the same as running split_nodes_delimiter for code, bold and
+    italic followed by split_nodes_image and split_nodes_link.
+
+    make_node is called as make_node(text, text_type, url) for each span; pass
+    textnode.text_to_html_node to get LeafNodes without intermediate TextNodes."""
+    if "`" not in text and "*" not in text:
+        if "[" not in text:
+            return [make_node(text, "text")] if text != "" else []
+        text_nodes = []
+        append_text_nodes(text_nodes, text, make_node)
+        return text_nodes
+    # split with capture groups returns the text between matches followed by
+    # the code, bold and italic groups of each match, None for the ones that
+    # didn't take part in it
+    parts = DELIMITED_MARKUP.split(text)
+    text_nodes = []
+    for i in range(0, len(parts) - 1, 4):
+        if parts[i] != "":
+            append_text_nodes(text_nodes, parts[i], make_node)
+        code, bold, italic = parts[i + 1 : i + 4]
+        if code:
+            text_nodes.append(make_node(code, "code"))
+        elif bold:
+            text_nodes.append(make_node(bold, "bold"))
+        elif italic:
+            text_nodes.append(make_node(italic, "italic"))
+    if parts[-1] != "":
+        append_text_nodes(text_nodes, parts[-1], make_node)
     return text_nodes
+
+
+def append_text_nodes(text_nodes, text, make_node=TextNode):
+    """Function that appends the image, link and text nodes of a span without
+    code, bold or italic markup, raising if it still holds an unpaired delimiter"""
+    if "`" in text or "*" in text:
+        raise SyntaxError("Invalid Markdown syntax")
+    if "[" not in text:
+        text_nodes.append(make_node(text, "text"))
+        return
+    if "![" not in text:
+        append_link_nodes(text_nodes, text, make_node)
+        return
+    parts = IMAGE_MARKUP.split(text)
+    for i in range(0, len(parts) - 1, 3):
+        if parts[i] != "":
+            append_link_nodes(text_nodes, parts[i], make_node)
+        text_nodes.append(make_node(parts[i + 1], "image", parts[i + 2]))
+    if parts[-1] != "":
+        append_link_nodes(text_nodes, parts[-1], make_node)
+
+
+def append_link_nodes(text_nodes, text, make_node=TextNode):
+    """Function that appends the link and text nodes of a span without images"""
+    parts = LINK_MARKUP.split(text)
+    for i in range(0, len(parts) - 1, 3):
+        if parts[i] != "":
+            text_nodes.append(make_node(parts[i], "text"))
+        text_nodes.append(make_node(parts[i + 1], "link", parts[i + 2]))
+    if parts[-1] != "":
+        text_nodes.append(make_node(parts[-1], "text"))
@@ -1,30 +1,330 @@
 """Primary module of the program"""
 
+import argparse
 import os
-import shutil
+import time
 
-from copystatic import copy_static_dir
+import profiling
+from assets import asset_digest, fingerprint_assets
+from block_markdown import BLOCK_CACHE
+from builder import Builder
+from compress import ENCODINGS, MIN_SIZE, precompress_dir, remove_precompressed
+from copystatic import sync_static_dir
+from daemon import serve_daemon
 from gencontent import generate_pages_recursive
+from manifest import load_manifest, save_manifest
+from parsecache import ParseCache
+from searchindex import SEARCH_INDEX_NAME, SearchIndex, remove_search_index
+from server import serve
+from watch import watch
 
 DIR_PATH_CONTENT = "./content"
 DIR_PATH_PUBLIC = "./public"
 DIR_PATH_STATIC = "./static"
 TEMPLATE_PATH = "./template.html"
+MANIFEST_PATH = "./.build/manifest.json"
+PROFILE_PATH = "./.build/profile.json"
+PARSE_CACHE_PATH = "./.build/cache"
+DEPLOY_DIFF_PATH = "./.build/deploy-diff.txt"
+SEARCH_PATH = "./.build/search.json"
 
 
-def main():
+def parse_args(argv=None):
+    """Function to parse the command line options"""
+    parser = argparse.ArgumentParser(description="Build the static site")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="build",
+        choices=["build", "watch", "serve", "daemon", "cache"],
+        help="build once, build then rebuild on changes while serving with live reload, build then serve, build then answer render and rebuild requests, or manage the parse cache",
+    )
+    parser.add_argument(
+        "action",
+        nargs="?",
+        choices=["prune"],
+        help="cache action: prune deletes stale entries and shrinks the parse cache to its size limit",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes used to render pages, 0 uses every CPU core",
+    )
+    parser.add_argument(
+        "--io-depth",
+        type=int,
+        default=0,
+        metavar="N",
+        help="overlap disk reads and writes with rendering, keeping up to N of each in flight (single process builds only)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="build pages one at a time, streaming each from source to output, so memory use stays flat however large the site",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hard link static files into public instead of copying them",
+    )
+    parser.add_argument(
+        "--hash-static",
+        action="store_true",
+        help="compare static files by content hash when their mtimes differ",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="also publish static files under content-hashed names, link pages to those and list them in asset-manifest.json",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help=f"write a prefix-searchable index of the pages to {SEARCH_INDEX_NAME}, with the search.js client that queries it",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help=f"write {' and '.join(ENCODINGS)} variants of html, css and other text outputs",
+    )
+    parser.add_argument(
+        "--precompress-min-size",
+        type=int,
+        default=MIN_SIZE,
+        metavar="BYTES",
+        help="smallest file that gets precompressed variants",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        default=BLOCK_CACHE.maxsize,
+        metavar="N",
+        help="number of rendered blocks kept for reuse across pages, 0 turns the cache off",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        type=float,
+        default=64,
+        metavar="MB",
+        help=f"size limit of the on-disk cache of parsed pages in {PARSE_CACHE_PATH}, 0 turns the cache off",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_PATH,
+        metavar="PATH",
+        help=f"write a Chrome trace of the build and a text summary next to it (default {PROFILE_PATH})",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8888, help="port the watch, serve and daemon servers listen on"
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Unix socket the daemon listens on instead of a local port",
+    )
+    parser.add_argument(
+        "--serve-cache",
+        type=float,
+        default=32,
+        metavar="MB",
+        help="memory the serve command uses to keep small files, 0 reads every file from disk",
+    )
+    parser.add_argument(
+        "--access-log",
+        action="store_true",
+        help="log every request the serve and daemon commands answer",
+    )
+    args = parser.parse_args(argv)
+    if (args.command == "cache") != (args.action is not None):
+        parser.error("an action is only accepted, and then required, by the cache command")
+    if (args.fingerprint or args.search) and args.command in ("watch", "daemon"):
+        parser.error(f"--fingerprint and --search are for deployed builds and cannot be used with {args.command}")
+    return args
+
+
+def main(argv=None):
     """Entry point function for the program"""
-    if os.path.exists(DIR_PATH_PUBLIC):
-        print("***** Removing --> public directory *****")
-        shutil.rmtree(DIR_PATH_PUBLIC)
-    print("***** Creating --> public directory *****")
-    os.mkdir(DIR_PATH_PUBLIC)
-    copy_static_dir(DIR_PATH_STATIC, DIR_PATH_PUBLIC)
-    generate_pages_recursive(
-        DIR_PATH_CONTENT,
-        TEMPLATE_PATH,
+    args = parse_args(argv)
+    if args.command == "cache":
+        stats = ParseCache(PARSE_CACHE_PATH, int(args.parse_cache * 2**20)).prune()
+        print(
+            f"***** Pruned {stats['removed']} parse cache entries, freed {stats['freed']} bytes, kept {stats['kept']} bytes *****"
+        )
+        return
+    manifest = load_manifest(MANIFEST_PATH)
+    if args.profile:
+        profiler = profiling.start()
+        with profiler.span("build", "build"):
+            build(args, manifest)
+        profiling.stop()
+        report_profile(profiler, args.profile)
+    else:
+        build(args, manifest)
+    paths = {
+        "content": DIR_PATH_CONTENT,
+        "static": DIR_PATH_STATIC,
+        "template": TEMPLATE_PATH,
+        "public": DIR_PATH_PUBLIC,
+    }
+    if args.command == "watch":
+        watch(
+            paths,
+            manifest,
+            MANIFEST_PATH,
+            args.port,
+        )
+    elif args.command == "serve":
+        serve(
+            DIR_PATH_PUBLIC,
+            args.port,
+            int(args.serve_cache * 2**20),
+            args.access_log,
+        )
+    elif args.command == "daemon":
+        serve_daemon(
+            Builder(paths, MANIFEST_PATH, manifest),
+            args.port,
+            args.socket,
+            args.access_log,
+        )
+
+
+def report_profile(profiler, trace_path):
+    """Function to write the trace and summary of a profiled build"""
+    summary = profiler.summary()
+    profiler.write_trace(trace_path)
+    summary_path = os.path.splitext(trace_path)[0] + ".txt"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(summary + "\n")
+    print(summary)
+    print(f"***** Wrote profile to {trace_path} and {summary_path} *****")
+
+
+def build(args, manifest):
+    """Function to bring the public directory up to date with the sources"""
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    # Streamed pages don't use the block cache, it would hold blocks in memory
+    BLOCK_CACHE.resize(0 if args.stream else args.block_cache)
+    if not os.path.exists(DIR_PATH_PUBLIC):
+        print("***** Creating --> public directory *****")
+        os.mkdir(DIR_PATH_PUBLIC)
+    changes = []
+    search = SearchIndex(SEARCH_PATH) if args.search else None
+    static_start = time.perf_counter_ns()
+    static_stats = sync_static_dir(
+        DIR_PATH_STATIC,
+        DIR_PATH_PUBLIC,
+        manifest,
+        link=args.link_static,
+        check_hash=args.hash_static,
+        changes=changes,
+    )
+    asset_urls = fingerprint_assets(
+        DIR_PATH_STATIC,
         DIR_PATH_PUBLIC,
+        manifest,
+        link=args.link_static,
+        changes=changes,
+        enabled=args.fingerprint,
+    )
+    if profiling.ACTIVE is not None:
+        profiling.ACTIVE.add("static sync", "build", static_start, time.perf_counter_ns())
+    cache = None
+    if args.parse_cache > 0 and not args.stream:
+        cache = ParseCache(
+            PARSE_CACHE_PATH, int(args.parse_cache * 2**20), salt=asset_digest(asset_urls)
+        )
+    try:
+        stats = generate_pages_recursive(
+            DIR_PATH_CONTENT,
+            TEMPLATE_PATH,
+            DIR_PATH_PUBLIC,
+            manifest,
+            jobs,
+            cache,
+            args.io_depth,
+            changes,
+            args.stream,
+            search,
+        )
+    except BaseException:
+        # Pages written before the failure have their entries invalidated in
+        # the manifest, which must be saved for the next build to redo them
+        save_manifest(MANIFEST_PATH, manifest)
+        raise
+    if search is not None:
+        search.save()
+        search_stats = search.write(DIR_PATH_PUBLIC, changes)
+    else:
+        remove_search_index(DIR_PATH_PUBLIC, changes)
+    if args.precompress:
+        compress_start = time.perf_counter_ns()
+        # Compression runs on threads, as many as the CPU count whatever -j is
+        compress_stats = precompress_dir(
+            DIR_PATH_PUBLIC,
+            manifest,
+            None,
+            args.precompress_min_size,
+            changes,
+        )
+        if profiling.ACTIVE is not None:
+            profiling.ACTIVE.add("precompress", "build", compress_start, time.perf_counter_ns())
+    else:
+        remove_precompressed(DIR_PATH_PUBLIC, manifest, changes)
+    save_manifest(MANIFEST_PATH, manifest)
+    write_deploy_diff(DEPLOY_DIFF_PATH, changes, DIR_PATH_PUBLIC)
+    if cache is not None and stats["generated"]:
+        cache.prune()
+    print(
+        f"***** Copied {static_stats['copied']} static files, skipped {static_stats['skipped']} unchanged, removed {static_stats['removed']} stale *****"
     )
+    if args.fingerprint:
+        print(f"***** Fingerprinted {len(asset_urls)} assets *****")
+    print(
+        f"***** Generated {stats['generated']} pages, skipped {stats['skipped']} unchanged, removed {stats['removed']} stale *****"
+    )
+    if search is not None:
+        print(
+            f"***** Indexed {search_stats['terms']} terms across {search_stats['pages']} pages for search *****"
+        )
+    if args.precompress:
+        saved = ", ".join(
+            f"{size} bytes with {suffix}" for suffix, size in compress_stats["saved"].items()
+        )
+        print(
+            f"***** Precompressed {compress_stats['compressed']} files, skipped {compress_stats['skipped']} unchanged, removed {compress_stats['removed']} stale, saving {saved} *****"
+        )
+    print(f"***** {len(changes)} outputs changed, listed in {DEPLOY_DIFF_PATH} *****")
+    rss = profiling.peak_rss()
+    if rss is not None:
+        workers = profiling.peak_rss(children=True) if jobs > 1 and not args.stream else None
+        print(
+            f"***** Peak RSS {rss / 2**20:.1f} MiB"
+            + (f", largest worker {workers / 2**20:.1f} MiB" if workers else "")
+            + " *****"
+        )
+    if jobs == 1 and stats["generated"] and not args.stream:
+        block_stats = BLOCK_CACHE.stats()
+        print(
+            f"***** Block cache: {block_stats['hits']} hits, {block_stats['misses']} misses ({block_stats['hit_rate']:.0%}), {block_stats['size']}/{block_stats['maxsize']} entries *****"
+        )
+        if cache is not None:
+            print(
+                f"***** Parse cache: {cache.hits} hits, {cache.misses} misses *****"
+            )
+
+
+def write_deploy_diff(path, changes, dest_dir_path):
+    """Function to write the outputs changed by a build, one per line as "M path"
+    for written files or "D path" for deleted ones, relative to the public directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for status, output in sorted(changes, key=lambda change: change[1]):
+            f.write(f"{status} {os.path.relpath(output, dest_dir_path)}\n")
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Module to record build inputs so unchanged pages can be skipped on rebuild"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+PARSER_MODULES = (
+    "block_markdown.py",
+    "inline_markdown.py",
+    "textnode.py",
+    "htmlnode.py",
+    "gencontent.py",
+    "template.py",
+)
+
+
+def hash_bytes(data):
+    """Function that returns the hex sha256 digest of a bytes object"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """Function that returns the hex sha256 digest of a file's contents"""
+    with open(path, "rb") as f:
+        return hash_fileobj(f)
+
+
+def hash_fileobj(f):
+    """Function that returns the hex sha256 digest of the rest of an open binary file"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1 << 16), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parser_version():
+    """Function that returns a hash of the parser source, so any change to the
+    code that turns markdown into html invalidates previously built pages"""
+    digest = hashlib.sha256()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in PARSER_MODULES:
+        with open(os.path.join(src_dir, module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def new_manifest():
+    """Function that returns an empty manifest"""
+    return {
+        "version": MANIFEST_VERSION,
+        "parser": None,
+        "template": None,
+        "pages": {},
+        "static": {},
+        "compressed": {},
+        "assets": {},
+    }
+
+
+def load_manifest(path):
+    """Function to read a manifest from disk, returns an empty manifest if the
+    file is missing, unreadable or was written by a different manifest version"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+    for key, value in new_manifest().items():
+        manifest.setdefault(key, value)
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """Function to write a manifest to disk, replacing the old one atomically"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with AtomicOutput(path) as out:
+        out.write(json.dumps(manifest, indent=1, sort_keys=True))
+
+
+class AtomicOutput:
+    """Class used as a context manager to write a build output without touching
+    it when the new contents are identical.
+
+    Text written to it is hashed as it is streamed into a temporary file beside
+    the destination. On exit the temporary file is renamed over the destination
+    if the hash differs from old_hash, or from the hash of the existing file
+    when old_hash is None, and deleted otherwise, so unchanged outputs keep
+    their mtime. The hash and whether the file changed are left in digest and
+    changed. Writers that may race on one path pass a tmp_path of their own."""
+
+    def __init__(self, path, old_hash=None, tmp_path=None):
+        self.path = path
+        self.old_hash = old_hash
+        self.tmp_path = tmp_path or f"{path}.tmp"
+        self.hasher = hashlib.sha256()
+        self.file = None
+        self.digest = None
+        self.changed = False
+
+    def __enter__(self):
+        self.file = open(self.tmp_path, "wb")  # pylint: disable=consider-using-with
+        return self
+
+    def write(self, text):
+        """Method to append text to the output"""
+        data = text.encode("utf-8")
+        self.hasher.update(data)
+        self.file.write(data)
+
+    def write_bytes(self, data):
+        """Method to append bytes to the output"""
+        self.hasher.update(data)
+        self.file.write(data)
+
+    def __exit__(self, exc_type, *exc_info):
+        self.file.close()
+        if exc_type is not None:
+            os.remove(self.tmp_path)
+            return
+        self.digest = self.hasher.hexdigest()
+        old_hash = self.old_hash
+        if old_hash is None and os.path.isfile(self.path):
+            old_hash = hash_file(self.path)
+        if old_hash == self.digest and os.path.isfile(self.path):
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, self.path)
+            self.changed = True
+
+
+def remove_output(path, root):
+    """Function to delete a build output and any directories below root it leaves empty"""
+    if os.path.exists(path):
+        os.remove(path)
+    root = os.path.abspath(root)
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory.startswith(root + os.sep) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
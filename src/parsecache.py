@@ -0,0 +1,102 @@
+"""Module to keep rendered page content on disk so later builds can skip parsing"""
+
+import os
+import shutil
+import threading
+
+from manifest import AtomicOutput, hash_bytes, parser_version
+
+
+class ParseCache:
+    """Class storing the html rendered from each markdown source, keyed by the
+    hash of the source text and a salt naming any other input the html depends
+    on, such as the asset urls it links to.
+
+    Entries live in a directory named after the parser version, so a change to
+    the parser code starts an empty directory and prune deletes the old ones.
+    Entries are plain files whose mtime is bumped on every hit, which lets prune
+    evict the least recently used ones first. The object only holds strings and
+    numbers, so it can be handed to worker processes."""
+
+    def __init__(self, root, max_bytes, version=None, salt=""):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.version = version or parser_version()
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, markdown):
+        """Method that returns the path of the entry for a markdown source"""
+        key = hash_bytes((self.salt + markdown).encode("utf-8"))
+        return os.path.join(self.root, self.version[:16], key[:2], key + ".html")
+
+    def get(self, markdown):
+        """Method that returns the cached html for a markdown source, or None"""
+        path = self.entry_path(markdown)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    def put(self, markdown, html):
+        """Method to store the html rendered from a markdown source. The entry is
+        written beside its final path and renamed into place, so concurrent
+        builds never see a partial entry. The temporary name carries the process
+        and thread ids, as threads of one build may store the same entry."""
+        path = self.entry_path(markdown)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with AtomicOutput(path, tmp_path=tmp_path) as out:
+            out.write(html)
+
+    def prune(self, max_bytes=None):
+        """Method to delete entries left by other parser versions, then the least
+        recently used entries until the cache fits in max_bytes. Returns a
+        dictionary with the removed entry count, bytes freed and bytes kept."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        stats = {"removed": 0, "freed": 0, "kept": 0}
+        if not os.path.isdir(self.root):
+            return stats
+        current = self.version[:16]
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            for dir_path, _, files in os.walk(path):
+                for file in files:
+                    file_path = os.path.join(dir_path, file)
+                    stat = os.stat(file_path)
+                    if name == current and file.endswith(".html"):
+                        entries.append((stat.st_mtime_ns, stat.st_size, file_path))
+                        continue
+                    if name == current:
+                        os.remove(file_path)
+                    stats["removed"] += 1
+                    stats["freed"] += stat.st_size
+            if name == current:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                stats["removed"] += 1
+                stats["freed"] += os.stat(path).st_size
+                os.remove(path)
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= max_bytes:
+                break
+            os.remove(file_path)
+            try:
+                os.rmdir(os.path.dirname(file_path))
+            except OSError:
+                pass
+            total -= size
+            stats["removed"] += 1
+            stats["freed"] += size
+        stats["kept"] = total
+        return stats
@@ -0,0 +1,118 @@
+"""Module to record timing spans of a build and write them as a Chrome trace.
+
+Profiling is off unless start() is called. Instrumented code checks ACTIVE for
+None before doing anything, so an unprofiled build only pays for that check."""
+
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ACTIVE = None
+
+
+class Span:
+    """Class used as a context manager that records one complete trace event"""
+
+    __slots__ = ("profiler", "name", "cat", "args", "start")
+
+    def __init__(self, profiler, name, cat, args):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+
+
+class Profiler:
+    """Class collecting trace events in the Chrome trace-event format"""
+
+    def __init__(self):
+        self.events = []
+
+    def span(self, name, cat, **args):
+        """Method that returns a context manager timing the code it wraps"""
+        return Span(self, name, cat, args)
+
+    def add(self, name, cat, start_ns, end_ns, args=None):
+        """Method to record a complete event from perf_counter_ns timestamps"""
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def write_trace(self, path):
+        """Method to write the events as a Chrome trace file, viewable in
+        chrome://tracing or https://ui.perfetto.dev"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self, top=10):
+        """Method that returns a text report of the slowest pages and the total
+        time spent in each stage and block type"""
+        pages = sorted(
+            (event for event in self.events if event["cat"] == "page"),
+            key=lambda event: event["dur"],
+            reverse=True,
+        )
+        totals = {}
+        for event in self.events:
+            if event["cat"] in ("build", "stage", "block"):
+                key = (event["cat"], event["name"])
+                count, dur = totals.get(key, (0, 0.0))
+                totals[key] = (count + 1, dur + event["dur"])
+        lines = [f"Slowest {min(top, len(pages))} of {len(pages)} pages:"]
+        for event in pages[:top]:
+            lines.append(f"  {event['dur'] / 1000:10.2f} ms  {event['args']['source']}")
+        lines.append("Time per build step, stage and block type:")
+        for (cat, name), (count, dur) in sorted(
+            totals.items(), key=lambda item: item[1][1], reverse=True
+        ):
+            lines.append(f"  {dur / 1000:10.2f} ms  {count:>7}x  {cat:<6} {name}")
+        return "\n".join(lines)
+
+
+def peak_rss(children=False):
+    """Function that returns the peak resident set size in bytes of this process,
+    or of its largest finished child process, or None where it is not available"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def start():
+    """Function to turn profiling on, returning the active Profiler"""
+    global ACTIVE  # pylint: disable=global-statement
+    ACTIVE = Profiler()
+    return ACTIVE
+
+
+def stop():
+    """Function to turn profiling off, returning the Profiler that was active"""
+    global ACTIVE  # pylint: disable=global-statement
+    profiler, ACTIVE = ACTIVE, None
+    return profiler
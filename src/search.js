@@ -0,0 +1,97 @@
+// Client for the search index written by `main.py build --search`.
+//
+//   const results = await siteSearch.search("tolk");
+//   // [{url: "/majesty/", title: "...", score: 6}, ...], best first
+//
+// The index is fetched once and queried in the browser, no search server is
+// needed. Every word of the query must prefix some term of a page; pages score
+// the counts of the terms each word matched, doubled for exact matches. This
+// mirrors searchindex.search in the generator.
+(function () {
+  "use strict";
+
+  const INDEX_URL = "/search-index.json.gz";
+  const TOKEN = /[\p{L}\p{N}]+/gu;
+  let indexPromise = null;
+
+  async function decode(response) {
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    // Servers that send the file with Content-Encoding: gzip have already inflated it
+    if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) {
+      return new TextDecoder().decode(bytes);
+    }
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).text();
+  }
+
+  function loadIndex() {
+    if (indexPromise === null) {
+      indexPromise = fetch(INDEX_URL).then(async (response) => {
+        if (!response.ok) {
+          throw new Error(`Failed to load ${INDEX_URL}: ${response.status}`);
+        }
+        return JSON.parse(await decode(response));
+      });
+      indexPromise.catch(() => {
+        indexPromise = null;
+      });
+    }
+    return indexPromise;
+  }
+
+  function lowerBound(terms, word) {
+    let low = 0;
+    let high = terms.length;
+    while (low < high) {
+      const middle = (low + high) >>> 1;
+      if (terms[middle] < word) {
+        low = middle + 1;
+      } else {
+        high = middle;
+      }
+    }
+    return low;
+  }
+
+  function matchWord(index, word) {
+    const matches = new Map();
+    for (let t = lowerBound(index.terms, word); t < index.terms.length && index.terms[t].startsWith(word); t++) {
+      const weight = index.terms[t] === word ? 2 : 1;
+      const flat = index.postings[t];
+      let page = 0;
+      for (let i = 0; i < flat.length; i += 2) {
+        page += flat[i];
+        matches.set(page, (matches.get(page) || 0) + flat[i + 1] * weight);
+      }
+    }
+    return matches;
+  }
+
+  async function search(query, limit = 10) {
+    const index = await loadIndex();
+    let scores = null;
+    for (const word of query.toLowerCase().match(TOKEN) || []) {
+      const matches = matchWord(index, word);
+      if (scores === null) {
+        scores = matches;
+        continue;
+      }
+      for (const [page, score] of scores) {
+        if (matches.has(page)) {
+          scores.set(page, score + matches.get(page));
+        } else {
+          scores.delete(page);
+        }
+      }
+    }
+    if (scores === null) {
+      return [];
+    }
+    return [...scores]
+      .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+      .slice(0, limit)
+      .map(([page, score]) => ({ url: index.pages[page][0], title: index.pages[page][1], score }));
+  }
+
+  globalThis.siteSearch = { search, loadIndex };
+})();
@@ -0,0 +1,181 @@
+"""Module to build a prefix-searchable inverted index of the generated pages"""
+
+import bisect
+import gzip
+import json
+import os
+import re
+from collections import Counter
+
+from manifest import AtomicOutput
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_NAME = "search-index.json.gz"
+SEARCH_CLIENT_NAME = "search.js"
+SEARCH_CLIENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), SEARCH_CLIENT_NAME)
+# Level 9 spends over ten times as long on the repetitive postings for a 5% smaller file
+SEARCH_INDEX_LEVEL = 6
+
+TOKEN = re.compile(r"[^\W_]+")
+LINK_TARGET = re.compile(r"\]\([^)]*\)")
+# Lowercases ascii letters and blanks other ascii bytes, keeping utf-8 sequences
+WORD_BYTES = bytes(
+    c if c >= 128 else ord(chr(c).lower()) if chr(c).isalnum() else 32 for c in range(256)
+)
+
+
+def text_terms(text, counts=None):
+    """Function that counts the lowercased words of markdown text into a Counter,
+    leaving out the urls of links and images.
+
+    The text is split with a byte translation table, about twice as fast as
+    running TOKEN over it, and only the distinct pieces holding non-ascii
+    characters are split again by TOKEN."""
+    counts = Counter() if counts is None else counts
+    pieces = Counter(LINK_TARGET.sub("]", text).encode("utf-8").translate(WORD_BYTES).split())
+    for piece, count in pieces.items():
+        if piece.isascii():
+            counts[piece.decode("ascii")] += count
+            continue
+        for word in TOKEN.findall(piece.decode("utf-8").lower()):
+            counts[word] += count
+    return counts
+
+
+def page_url(dest_path, dest_dir_path):
+    """Function that returns the url path a generated index.html is served at"""
+    rel_dir = os.path.relpath(os.path.dirname(dest_path), dest_dir_path)
+    if rel_dir == os.curdir:
+        return "/"
+    return "/" + rel_dir.replace(os.sep, "/") + "/"
+
+
+class SearchIndex:
+    """Class keeping the title and term counts of every page between builds.
+
+    Each page is recorded under its source path with the hash of the source it
+    was read from, so a build only needs the documents of pages it regenerates
+    and pages built while the index was not kept are found stale by their hash.
+    The records are saved to path and turned into the published index by write."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get("version") != SEARCH_INDEX_VERSION:
+            data = {"version": SEARCH_INDEX_VERSION, "pages": {}}
+        self.pages = data["pages"]
+
+    def is_current(self, from_path, source_hash):
+        """Method that checks whether a page's record was made from this source"""
+        record = self.pages.get(from_path)
+        return record is not None and record["hash"] == source_hash
+
+    def update(self, from_path, source_hash, url, document):
+        """Method to record the (title, term counts) document of a page"""
+        title, terms = document
+        self.pages[from_path] = {"hash": source_hash, "url": url, "title": title, "terms": terms}
+
+    def retain(self, from_paths):
+        """Method to drop the records of pages that are no longer built"""
+        for from_path in self.pages.keys() - set(from_paths):
+            del self.pages[from_path]
+
+    def save(self):
+        """Method to write the page records to disk, replacing the old ones atomically"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with AtomicOutput(self.path) as out:
+            out.write(json.dumps({"version": SEARCH_INDEX_VERSION, "pages": self.pages}))
+
+    def build(self):
+        """Method that returns the published index: pages as [url, title] pairs
+        ordered by url, the sorted list of terms, and for each term its postings
+        as a flat list of page number deltas and counts"""
+        records = sorted(self.pages.values(), key=lambda record: record["url"])
+        postings = {}
+        for number, record in enumerate(records):
+            for term, count in record["terms"].items():
+                postings.setdefault(term, []).append((number, count))
+        terms = sorted(postings)
+        encoded = []
+        for term in terms:
+            flat = []
+            previous = 0
+            for number, count in postings[term]:
+                flat += (number - previous, count)
+                previous = number
+            encoded.append(flat)
+        return {
+            "version": SEARCH_INDEX_VERSION,
+            "pages": [[record["url"], record["title"]] for record in records],
+            "terms": terms,
+            "postings": encoded,
+        }
+
+    def write(self, dest_dir_path, changes=None):
+        """Method to write the gzipped index and its client script into
+        dest_dir_path, leaving either untouched when its contents are unchanged.
+        Returns a dictionary counting the pages and terms indexed."""
+        index = self.build()
+        data = json.dumps(index, separators=(",", ":")).encode()
+        outputs = (
+            (SEARCH_INDEX_NAME, gzip.compress(data, compresslevel=SEARCH_INDEX_LEVEL, mtime=0)),
+            (SEARCH_CLIENT_NAME, read_client_script()),
+        )
+        for name, data in outputs:
+            path = os.path.join(dest_dir_path, name)
+            with AtomicOutput(path) as out:
+                out.write_bytes(data)
+            if out.changed and changes is not None:
+                changes.append(("M", path))
+        return {"pages": len(index["pages"]), "terms": len(index["terms"])}
+
+
+def read_client_script():
+    """Function that returns the client script querying the index"""
+    with open(SEARCH_CLIENT_PATH, "rb") as f:
+        return f.read()
+
+
+def remove_search_index(dest_dir_path, changes=None):
+    """Function to delete the published index and its client script, if any"""
+    for name in (SEARCH_INDEX_NAME, SEARCH_CLIENT_NAME):
+        path = os.path.join(dest_dir_path, name)
+        if os.path.exists(path):
+            os.remove(path)
+            if changes is not None:
+                changes.append(("D", path))
+
+
+def search(index, query, limit=10):
+    """Function that queries a published index the way the client script does.
+
+    Every word of the query must prefix some term of a page. Pages score the
+    counts of the terms each word matched, doubled for exact matches. Returns
+    up to limit (url, title, score) tuples, best first."""
+    terms = index["terms"]
+    scores = None
+    for word in TOKEN.findall(query.lower()):
+        matches = Counter()
+        position = bisect.bisect_left(terms, word)
+        while position < len(terms) and terms[position].startswith(word):
+            weight = 2 if terms[position] == word else 1
+            flat = index["postings"][position]
+            number = 0
+            for i in range(0, len(flat), 2):
+                number += flat[i]
+                matches[number] += flat[i + 1] * weight
+            position += 1
+        if scores is None:
+            scores = matches
+        else:
+            scores = Counter(
+                {number: score + matches[number] for number, score in scores.items() if number in matches}
+            )
+    if not scores:
+        return []
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [(*index["pages"][number], score) for number, score in ranked]
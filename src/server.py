@@ -0,0 +1,267 @@
+"""Module to serve the public directory with caching headers and precompressed variants"""
+
+# pylint: disable=line-too-long
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from assets import ASSET_MANIFEST_NAME, FINGERPRINT_LENGTH, load_immutable_paths
+from compress import COMPRESSIBLE_EXTENSIONS
+from manifest import hash_fileobj
+
+CONTENT_ENCODINGS = ((".zst", "zstd"), (".gz", "gzip"))
+MAX_CACHED_FILE = 256 * 1024
+FINGERPRINTED = re.compile(rf"\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}(\.[^./]+)?$")
+
+
+class FileCache:
+    """Class holding a bounded LRU cache of small files and their ETags.
+
+    Entries are keyed by path and remember the (size, mtime, inode) they were
+    read at, so a file replaced on disk is read again on its next request.
+    Files larger than max_file bytes are never cached, but their ETag is, so
+    each version of a large file is hashed only once. The cache is shared by
+    every request thread and guarded by a lock."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_file=MAX_CACHED_FILE):
+        self.max_bytes = max_bytes
+        self.max_file = max_file
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, path, f):
+        """Method that returns an (etag, data) pair for the file at path, opened
+        as the binary file f, where data is the file contents when it is small
+        enough to be kept in memory and None otherwise. The file is identified,
+        read and hashed through f, so a file renamed over path meanwhile can't
+        mix into the answer. f is left at its start."""
+        stat = os.fstat(f.fileno())
+        key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == key:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        data = None
+        if stat.st_size <= self.max_file:
+            data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            digest = hash_fileobj(f)
+        f.seek(0)
+        etag = f'"{digest[:32]}"'
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[2] or b"")
+            if data is not None and len(data) > self.max_bytes:
+                data = None
+            self.entries[path] = (key, etag, data)
+            self.size += len(data or b"")
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted or b"")
+        return etag, data
+
+
+class ImmutablePaths:
+    """Class answering whether a url path is a fingerprinted asset, from the
+    asset manifest of the directory being served. Only paths shaped like a
+    fingerprinted name cost a stat of the manifest, which is read again
+    whenever it changes on disk."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, ASSET_MANIFEST_NAME)
+        self.key = None
+        self.paths = frozenset()
+        self.lock = threading.Lock()
+
+    def __contains__(self, url_path):
+        if not FINGERPRINTED.search(url_path):
+            return False
+        try:
+            stat = os.stat(self.manifest_path)
+            key = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            key = None
+        with self.lock:
+            if key != self.key:
+                self.paths = load_immutable_paths(self.directory) if key else frozenset()
+                self.key = key
+            return url_path in self.paths
+
+
+def accepted_encodings(header):
+    """Function that returns the set of content codings an Accept-Encoding header allows"""
+    accepted = set()
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    """Class answering GET and HEAD requests for files with strong ETags, 304
+    responses to matching If-None-Match headers, precompressed variants chosen
+    by Accept-Encoding, small files from memory and large files with sendfile.
+    Connections are kept alive between requests."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    cache = FileCache()
+    immutable = frozenset()
+    access_log = False
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        """Method that answers a request for a file, with or without its body"""
+        path = self.translate_path(self.path)
+        url_path = self.path.split("?", 1)[0]
+        if os.path.isdir(path):
+            if not url_path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = os.path.join(path, "index.html")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        content_type = self.guess_type(path)
+        compressible = os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS
+        encoding = None
+        if compressible:
+            accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+            for suffix, coding in CONTENT_ENCODINGS:
+                if coding not in accepted:
+                    continue
+                try:
+                    variant_stat = os.stat(path + suffix)
+                except OSError:
+                    continue
+                if variant_stat.st_mtime_ns == stat.st_mtime_ns:
+                    path, stat, encoding = path + suffix, variant_stat, coding
+                    break
+
+        # Builds replace files by renaming over them, so the length, ETag and
+        # body all come from this one open file rather than from the path
+        try:
+            f = open(path, "rb")  # pylint: disable=consider-using-with
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+        with f:
+            etag, data = self.cache.lookup(path, f)
+            if etag_matches(self.headers.get("If-None-Match"), etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_cache_headers(etag, content_type, compressible, url_path)
+                self.end_headers()
+                return
+
+            length = len(data) if data is not None else os.fstat(f.fileno()).st_size
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(length))
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            self.send_cache_headers(etag, content_type, compressible, url_path)
+            self.end_headers()
+            if not send_body:
+                return
+            if data is not None:
+                self.wfile.write(data)
+                return
+            self.connection.sendfile(f, 0, length)
+
+    def send_cache_headers(self, etag, content_type, compressible, url_path=""):
+        """Method to send the headers a client needs to cache and revalidate a
+        response. Fingerprinted assets never change, so they are cached for a year
+        without revalidation."""
+        self.send_header("ETag", etag)
+        if unquote(url_path) in self.immutable:
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        elif content_type.startswith("text/html"):
+            self.send_header("Cache-Control", "no-cache")
+        else:
+            self.send_header("Cache-Control", "public, max-age=3600")
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+def etag_matches(header, etag):
+    """Function that checks whether an If-None-Match header matches an ETag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class StaticServer(ThreadingHTTPServer):
+    """Class running each connection on its own thread with a deep listen backlog"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(directory, port=8888, cache_bytes=32 * 1024 * 1024, access_log=False, host=""):
+    """Function that returns a threaded server for a directory, with its own file cache"""
+    handler_class = type(
+        "BoundStaticHandler",
+        (StaticHandler,),
+        {
+            "cache": FileCache(cache_bytes),
+            "immutable": ImmutablePaths(directory),
+            "access_log": access_log,
+        },
+    )
+    return StaticServer((host, port), partial(handler_class, directory=directory))
+
+
+def serve(directory, port=8888, cache_bytes=32 * 1024 * 1024, access_log=False):
+    """Function to serve a directory until interrupted"""
+    server = make_server(directory, port, cache_bytes, access_log)
+    print(f"***** Serving {directory} at http://localhost:{server.server_address[1]} *****")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
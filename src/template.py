@@ -0,0 +1,140 @@
+"""Module to compile html templates into literal segments and named slots"""
+
+import os
+import re
+
+import assets
+from manifest import hash_bytes
+
+PLACEHOLDER = re.compile(r'\{\{\s*(?:include\s+"([^"]+)"|(\w+))\s*\}\}')
+ASSET_LINK = re.compile(r'(\b(?:href|src)=")(/[^"]*)(")')
+
+_TEMPLATE_CACHE = {}
+
+
+class CompiledTemplate:
+    """Class holding a parsed template as a list of (slot name, text) segments.
+
+    Literal segments have a slot name of None. Slot segments keep the original
+    placeholder text so unknown slots can be written back unchanged."""
+
+    def __init__(self, path, segments, dependencies):
+        self.path = path
+        self.segments = segments
+        self.dependencies = dependencies
+        self.digest = hash_bytes(
+            "".join(dependencies[dep][1] for dep in sorted(dependencies)).encode()
+        )
+        self.rewritten = None
+
+    def render(self, fp, context):
+        """Method that streams the template to a file-like object, filling each slot
+        from the context dictionary. Values can be strings, HTMLNodes, which are
+        streamed with write_html, or callables that take the file object."""
+        write = fp.write
+        for name, text in self.segments:
+            if name is None:
+                write(text)
+                continue
+            value = context.get(name)
+            if value is None:
+                write(text)
+            elif isinstance(value, str):
+                write(value)
+            elif hasattr(value, "write_html"):
+                value.write_html(fp)
+            else:
+                value(fp)
+
+    def with_asset_urls(self, urls, digest):
+        """Method that returns a copy of the template whose href and src attributes
+        link to the fingerprinted urls of assets, with digest folded into its own.
+        The copy is kept for the next call with the same digest."""
+        if self.rewritten is not None and self.rewritten[0] == digest:
+            return self.rewritten[1]
+
+        def replace(match):
+            return match.group(1) + urls.get(match.group(2), match.group(2)) + match.group(3)
+
+        template = CompiledTemplate(
+            self.path,
+            [
+                (name, text if name is not None else ASSET_LINK.sub(replace, text))
+                for name, text in self.segments
+            ],
+            self.dependencies,
+        )
+        template.digest = hash_bytes((self.digest + digest).encode())
+        self.rewritten = (digest, template)
+        return template
+
+    def is_stale(self):
+        """Method that checks whether the template or one of its includes changed
+        on disk. Files whose mtime moved but whose contents hash the same are
+        refreshed in place instead of being reported as changed."""
+        for path, (mtime, digest) in self.dependencies.items():
+            try:
+                current_mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return True
+            if current_mtime == mtime:
+                continue
+            with open(path, "rb") as f:
+                if hash_bytes(f.read()) != digest:
+                    return True
+            self.dependencies[path] = (current_mtime, digest)
+        return False
+
+
+def compile_template(path):
+    """Function to parse a template file, inlining its includes, into a CompiledTemplate"""
+    dependencies = {}
+    segments = []
+    _compile_into(path, segments, dependencies, ())
+    merged = []
+    for name, text in segments:
+        if name is None and merged and merged[-1][0] is None:
+            merged[-1] = (None, merged[-1][1] + text)
+        elif name is not None or text != "":
+            merged.append((name, text))
+    return CompiledTemplate(path, merged, dependencies)
+
+
+def _compile_into(path, segments, dependencies, include_stack):
+    """Recursive function that appends the segments of one template file"""
+    path = os.path.normpath(path)
+    if path in include_stack:
+        raise ValueError(f"Template include cycle: {' -> '.join(include_stack + (path,))}")
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, "rb") as f:
+        data = f.read()
+    dependencies[path] = (mtime, hash_bytes(data))
+    text = data.decode("utf-8")
+    pos = 0
+    for match in PLACEHOLDER.finditer(text):
+        segments.append((None, text[pos : match.start()]))
+        pos = match.end()
+        include, name = match.groups()
+        if include is not None:
+            _compile_into(
+                os.path.join(os.path.dirname(path), include),
+                segments,
+                dependencies,
+                include_stack + (path,),
+            )
+        else:
+            segments.append((name, match.group(0)))
+    segments.append((None, text[pos:]))
+
+
+def load_template(path):
+    """Function that returns the compiled template for a path, compiling it once
+    and again only when the template or one of its includes changes. While
+    assets are fingerprinted, the template links to their fingerprinted urls."""
+    template = _TEMPLATE_CACHE.get(path)
+    if template is None or template.is_stale():
+        template = compile_template(path)
+        _TEMPLATE_CACHE[path] = template
+    if assets.ASSET_DIGEST:
+        return template.with_asset_urls(assets.ASSET_URLS, assets.ASSET_DIGEST)
+    return template
@@ -0,0 +1,127 @@
+"""Module for testing the assets module"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from assets import (
+    ASSET_MANIFEST_NAME,
+    asset_url,
+    fingerprint_assets,
+    fingerprinted_path,
+    load_immutable_paths,
+    set_asset_urls,
+)
+from manifest import hash_bytes, new_manifest
+from template import load_template
+from test_support import TempDirTestCase
+from textnode import text_to_html_node
+
+
+class TestFingerprintAssets(TempDirTestCase):
+    """Class for testing fingerprinted copies of static files"""
+
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(self.public)
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "PNG")
+        self.manifest = new_manifest()
+
+    def tearDown(self):
+        set_asset_urls({})
+        super().tearDown()
+
+    def fingerprint(self, **kwargs):
+        """Helper to run a quiet fingerprinting pass"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fingerprint_assets(self.static, self.public, self.manifest, **kwargs)
+
+    def test_copies_under_content_hash(self):
+        """Test each asset is copied to a name carrying its hash and listed in the asset manifest"""
+        urls = self.fingerprint()
+        css = fingerprinted_path("index.css", hash_bytes(b"body {}"))
+        self.assertEqual(urls["/index.css"], "/" + css)
+        self.assertEqual(urls["/images/logo.png"], f"/images/logo.{hash_bytes(b'PNG')[:10]}.png")
+        self.assertTrue(os.path.isfile(os.path.join(self.public, css)))
+        with open(os.path.join(self.public, ASSET_MANIFEST_NAME), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), urls)
+        self.assertEqual(load_immutable_paths(self.public), set(urls.values()))
+        self.assertEqual(asset_url("/index.css"), "/" + css)
+        self.assertEqual(asset_url("/other.css"), "/other.css")
+
+    def test_changed_asset_replaces_old_copy(self):
+        """Test a changed asset gets a new name and its old copy is removed"""
+        old = self.fingerprint()["/index.css"]
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        changes = []
+        new = self.fingerprint(changes=changes)["/index.css"]
+        self.assertNotEqual(old, new)
+        self.assertFalse(os.path.exists(self.public + old))
+        self.assertTrue(os.path.exists(self.public + new))
+        self.assertIn(("D", os.path.join(self.public, old[1:])), changes)
+        self.assertIn(("M", os.path.join(self.public, new[1:])), changes)
+
+    def test_unchanged_assets_are_not_rehashed(self):
+        """Test hashes recorded for unchanged files are reused"""
+        self.fingerprint()
+        self.manifest["assets"]["index.css"]["hash"] = "f" * 64
+        urls = self.fingerprint()
+        self.assertEqual(urls["/index.css"], "/index.ffffffffff.css")
+
+    def test_disabled_removes_fingerprints(self):
+        """Test turning fingerprinting off removes every copy and the asset manifest"""
+        urls = self.fingerprint()
+        changes = []
+        self.assertEqual(self.fingerprint(enabled=False, changes=changes), {})
+        for url in urls.values():
+            self.assertFalse(os.path.exists(self.public + url))
+        self.assertFalse(os.path.exists(os.path.join(self.public, ASSET_MANIFEST_NAME)))
+        self.assertEqual(len(changes), 3)
+        self.assertEqual(self.manifest["assets"], {})
+
+
+class TestAssetRewriting(unittest.TestCase):
+    """Class for testing pages link to fingerprinted assets"""
+
+    def tearDown(self):
+        set_asset_urls({})
+
+    def test_image_source(self):
+        """Test image sources are rewritten and other urls left alone"""
+        set_asset_urls({"/a.png": "/a.0123456789.png"})
+        self.assertEqual(
+            text_to_html_node("alt", "image", "/a.png").to_html(),
+            '<img src="/a.0123456789.png" alt="alt">',
+        )
+        self.assertEqual(
+            text_to_html_node("a", "link", "/a.png").to_html(), '<a href="/a.png">a</a>'
+        )
+
+    def test_template_links(self):
+        """Test template href and src attributes are rewritten and change its digest"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('<link href="/index.css"><script src="/app.js"></script>{{ Content }}')
+            plain = load_template(path)
+            set_asset_urls({"/index.css": "/index.0123456789.css"})
+            template = load_template(path)
+            out = io.StringIO()
+            template.render(out, {"Content": "x"})
+            self.assertEqual(
+                out.getvalue(),
+                '<link href="/index.0123456789.css"><script src="/app.js"></script>x',
+            )
+            self.assertNotEqual(template.digest, plain.digest)
+            self.assertIs(load_template(path), template)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Module for testing the benchmark package"""
+
+import os
+import tempfile
+import unittest
+
+from benchmark.corpus import SHAPES, generate_corpus
+from benchmark.stages import run_stages
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "template.html")
+
+
+class TestBenchmark(unittest.TestCase):
+    """Class for testing corpus generation and stage timing"""
+
+    def test_every_shape_builds(self):
+        """Test each corpus shape produces pages the parser accepts"""
+        for shape in SHAPES:
+            with tempfile.TemporaryDirectory() as root:
+                paths = generate_corpus(root, pages=12, blocks=20, shape=shape, fanout=3)
+                self.assertEqual(len(paths), 12)
+                results = run_stages(paths, TEMPLATE_PATH)
+                self.assertIn("text_to_textnodes", results)
+                self.assertTrue(all(seconds >= 0 for seconds in results.values()))
+
+    def test_corpus_is_deterministic(self):
+        """Test the same seed generates the same tree"""
+        contents = []
+        for _ in range(2):
+            with tempfile.TemporaryDirectory() as root:
+                paths = generate_corpus(root, pages=3, seed=5)
+                with open(paths[-1], "r", encoding="utf-8") as f:
+                    contents.append((sorted(os.path.relpath(p, root) for p in paths), f.read()))
+        self.assertEqual(contents[0], contents[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
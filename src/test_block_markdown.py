@@ -2,26 +2,32 @@
 
 # pylint: disable=line-too-long
 
+import io
 import unittest
 
 from block_markdown import (
+    BLOCK_CACHE,
     BLOCK_TYPE_CODE,
     BLOCK_TYPE_HEADING,
     BLOCK_TYPE_ORDERED_LIST,
     BLOCK_TYPE_PARAGRAPH,
     BLOCK_TYPE_QUOTE,
     BLOCK_TYPE_UNORDERED_LIST,
+    BlockCache,
     block_to_block_type,
+    classify_block,
     code_block_to_html,
     heading_block_to_html,
+    iter_blocks,
     markdown_to_blocks,
     markdown_to_html,
     ordered_list_block_to_html,
     paragraph_block_to_html,
     quote_block_to_html,
     unordered_list_block_to_html,
+    write_markdown_html,
 )
-from htmlnode import LeafNode, ParentNode
+from htmlnode import FrozenNode, LeafNode, ParentNode
 
 
 class TestBlockMarkdown(unittest.TestCase):
@@ -143,6 +149,23 @@ This is the same paragraph on a new line
             ).to_html(),
         )
 
+    def test_code_block_is_verbatim(self):
+        """Test code is escaped but not parsed for inline markdown"""
+        block = "```\nif (a < b && *p) { return [x](y) * 2; }\n```"
+        self.assertEqual(
+            code_block_to_html(block, BLOCK_TYPE_CODE).to_html(),
+            "<pre><code>\nif (a &lt; b &amp;&amp; *p) { return [x](y) * 2; }\n</code></pre>",
+        )
+
+    def test_inline_text_is_escaped(self):
+        """Test text, code spans, link text and image alt text are escaped"""
+        self.assertEqual(
+            markdown_to_html(
+                'a < b & `<tag>` [x > y](/q?a=1&b="2") ![<alt>](/i.png)'
+            ).to_html(),
+            '<div><p>a &lt; b &amp; <code>&lt;tag&gt;</code> <a href="/q?a=1&amp;b=&quot;2&quot;">x &gt; y</a> <img src="/i.png" alt="&lt;alt&gt;"></p></div>',
+        )
+
     def test_unordered_list_block_to_html_asterisk(self):
         """Test markdown to html unordered list with asterisk marker"""
         block = "* This is the first list item\n* This is the second list item\n* This is the third list item"
@@ -342,6 +365,98 @@ This is the same paragraph on a new line
             ).to_html(),
         )
 
+    def test_markdown_to_blocks_indented_code(self):
+        """Test indented and blank lines inside a code fence stay in one block"""
+        document = "Intro\n\n```\ndef f():\n    return 1\n\n    pass\n```\n\nOutro"
+        self.assertEqual(
+            markdown_to_blocks(document),
+            ["Intro", "```\ndef f():\n    return 1\n\n    pass\n```", "Outro"],
+        )
+
+    def test_markdown_to_blocks_empty(self):
+        """Test an empty document has no blocks"""
+        self.assertEqual(markdown_to_blocks(""), [])
+        self.assertEqual(markdown_to_blocks("\n\n  \n"), [])
+
+    def test_iter_blocks_file(self):
+        """Test blocks are read from a file object with their types attached"""
+        blocks = list(iter_blocks(io.StringIO("# Title\n\n* one\n* two\n")))
+        self.assertEqual(
+            [(block.text, block.block_type) for block in blocks],
+            [("# Title", BLOCK_TYPE_HEADING), ("* one\n* two", BLOCK_TYPE_UNORDERED_LIST)],
+        )
+
+    def test_iter_blocks_is_lazy(self):
+        """Test a block is yielded before the lines after it are read"""
+
+        def lines():
+            yield "First paragraph\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(iter_blocks(lines())).text, "First paragraph")
+
+    def test_write_markdown_html(self):
+        """Test streaming a document gives the same html as markdown_to_html,
+        without keeping its blocks in the block cache"""
+        BLOCK_CACHE.clear()
+        buffer = io.StringIO()
+        write_markdown_html(io.StringIO(MARKDOWN), buffer)
+        self.assertEqual(BLOCK_CACHE.stats()["size"], 0)
+        self.assertEqual(buffer.getvalue(), markdown_to_html(MARKDOWN).to_html())
+
+    def test_classify_block_keeps_lines(self):
+        """Test the classified record carries the lines used for validation"""
+        block = classify_block("1. one\n2. two")
+        self.assertEqual(block.block_type, BLOCK_TYPE_ORDERED_LIST)
+        self.assertEqual(block.lines, ["1. one", "2. two"])
+
+    def test_classify_block_errors(self):
+        """Test malformed blocks raise the same SyntaxError messages as before"""
+        cases = {
+            "```never closed": "Invalid Markdown: Code block must end with ```",
+            "> quote\nnot quote": "Invalid Markdown: Every line in a quote block must begin with > followed by a space",
+            "* item\nnot item": "Invalid Markdown: Every line in an unordered list list must start with * or -",
+            "1. one\n3. three": "Invalid Markdown: Every line in an ordered list must start with a number followed by a . and a space, additionally each line must increment the number by one",
+        }
+        for block, message in cases.items():
+            with self.assertRaises(SyntaxError) as ctx:
+                classify_block(block)
+            self.assertEqual(str(ctx.exception), message)
+
+    def test_block_cache_hits_and_misses(self):
+        """Test a repeated block is rendered once, then frozen and served from the cache"""
+        cache = BlockCache(4)
+        first = cache.render("# Title")
+        self.assertNotIsInstance(first, FrozenNode)
+        shared = cache.render("# Title")
+        self.assertIsInstance(shared, FrozenNode)
+        self.assertIs(cache.render("# Title"), shared)
+        self.assertEqual(shared.to_html(), first.to_html())
+        self.assertEqual(first.to_html(), "<h1>Title</h1>")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 1, 1))
+        self.assertEqual(stats["hit_rate"], 2 / 3)
+
+    def test_block_cache_evicts_least_recently_used(self):
+        """Test the oldest untouched block is evicted once the cache is full"""
+        cache = BlockCache(2)
+        cache.render("a")
+        cache.render("b")
+        cache.render("a")
+        cache.render("c")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        cache.resize(1)
+        self.assertEqual(list(cache.entries), ["c"])
+
+    def test_block_cache_disabled(self):
+        """Test a maxsize of 0 renders every block without storing it"""
+        cache = BlockCache(0)
+        self.assertEqual(cache.render("text").to_html(), "<p>text</p>")
+        cache.render("text")
+        self.assertEqual(cache.stats()["misses"], 2)
+        self.assertEqual(cache.stats()["size"], 0)
+
 
 MARKDOWN = """# This is a **bold** H1 heading
 
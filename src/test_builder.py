@@ -0,0 +1,73 @@
+"""Module for testing the builder module"""
+
+import contextlib
+import io
+import os
+import unittest
+
+from block_markdown import markdown_to_html
+from builder import Builder, Renderer
+from test_support import TempDirTestCase
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestBuilder(TempDirTestCase):
+    """Class for testing rendering and building through the Builder API"""
+
+    def setUp(self):
+        super().setUp()
+        self.paths = self.site_paths()
+        self.manifest_path = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.paths["content"], "blog"))
+        os.makedirs(self.paths["static"])
+        self.write(self.paths["template"], TEMPLATE)
+        self.write(os.path.join(self.paths["content"], "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.paths["content"], "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(os.path.join(self.paths["static"], "index.css"), "body {}")
+
+    def test_renderer(self):
+        """Test markdown strings render like a build, into the template when asked"""
+        renderer = Renderer(self.paths["template"])
+        markdown = "# Title\n\nSome **bold** text"
+        self.assertEqual(renderer.render(markdown), markdown_to_html(markdown).to_html())
+        self.assertEqual(
+            renderer.render_page(markdown),
+            "<title>Title</title><main><div><h1>Title</h1><p>Some <b>bold</b> text</p></div></main>",
+        )
+        with self.assertRaises(ValueError):
+            renderer.render_page("no heading")
+
+    def test_build_and_rebuild(self):
+        """Test a full build, then a rebuild of one page named the way a client would"""
+        builder = Builder(self.paths, self.manifest_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = builder.build()
+        self.assertEqual(stats["pages"]["generated"], 2)
+        self.assertEqual(stats["static"]["copied"], 1)
+        self.assertTrue(os.path.isfile(self.manifest_path))
+
+        blog = os.path.join(self.paths["content"], "blog", "index.md")
+        self.write(blog, "# Blog\n\nNew posts")
+        builder = Builder(self.paths, self.manifest_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            touched = builder.rebuild([os.path.relpath(blog)])
+        self.assertEqual(touched, 1)
+        self.assertIn(
+            "New posts", self.read(os.path.join(self.paths["public"], "blog", "index.html"))
+        )
+        self.assertEqual(list(builder.manifest["pages"]).count(blog), 1)
+        self.assertEqual(len(builder.manifest["pages"]), 2)
+
+    def test_source_path(self):
+        """Test paths are respelled under the roots the manifest was built with"""
+        builder = Builder({**self.paths, "content": "./content", "static": "./static"}, self.manifest_path)
+        self.assertEqual(
+            builder.source_path(os.path.join("content", "a.md")), os.path.join("./content", "a.md")
+        )
+        self.assertEqual(builder.source_path("static"), "./static")
+        self.assertEqual(builder.source_path("./template.html"), "template.html")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Module for testing the compress module"""
+
+import gzip
+import os
+import unittest
+
+from compress import ENCODINGS, precompress_dir, remove_precompressed
+from manifest import new_manifest
+from test_support import TempDirTestCase
+
+CSS = "body { margin: 0; padding: 0 }\n" * 100
+
+
+class TestPrecompressDir(TempDirTestCase):
+    """Class for testing precompressed variants"""
+
+    def setUp(self):
+        super().setUp()
+        os.mkdir(os.path.join(self.root, "blog"))
+        self.write("index.css", CSS)
+        self.write(os.path.join("blog", "index.html"), "<p>post</p>" * 200)
+        self.write("small.css", "body {}")
+        self.write("logo.png", "PNG" * 1000)
+        self.manifest = new_manifest()
+
+    def test_compresses_large_text_files(self):
+        """Test variants are written for large text files only"""
+        stats = precompress_dir(self.root, self.manifest)
+        self.assertEqual(stats["compressed"], 2)
+        with gzip.open(os.path.join(self.root, "index.css.gz"), "rt") as f:
+            self.assertEqual(f.read(), CSS)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "small.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "logo.png.gz")))
+        for suffix in ENCODINGS:
+            self.assertGreater(stats["saved"][suffix], 0)
+
+    def test_unchanged_files_are_skipped(self):
+        """Test a second run skips files whose size and mtime did not change"""
+        first = precompress_dir(self.root, self.manifest)
+        changes = []
+        second = precompress_dir(self.root, self.manifest, changes=changes)
+        self.assertEqual((second["compressed"], second["skipped"]), (0, 2))
+        self.assertEqual(second["saved"], first["saved"])
+        self.assertEqual(changes, [])
+
+    def test_stale_variants_are_removed(self):
+        """Test variants of deleted or shrunken files are removed"""
+        precompress_dir(self.root, self.manifest)
+        os.remove(os.path.join(self.root, "blog", "index.html"))
+        self.write("index.css", "body {}")
+        changes = []
+        stats = precompress_dir(self.root, self.manifest, changes=changes)
+        self.assertEqual(stats["removed"], 2)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "index.css.gz")))
+        self.assertIn(("D", os.path.join(self.root, "index.css.gz")), changes)
+
+    def test_disabled_removes_variants(self):
+        """Test turning precompression off removes every recorded variant"""
+        precompress_dir(self.root, self.manifest)
+        changes = []
+        self.assertEqual(remove_precompressed(self.root, self.manifest, changes), 2)
+        self.assertEqual(self.manifest["compressed"], {})
+        self.assertEqual(len(changes), 2 * len(ENCODINGS))
+        for dir_path, _, files in os.walk(self.root):
+            for file in files:
+                self.assertNotIn(os.path.splitext(file)[1], ENCODINGS, os.path.join(dir_path, file))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Module for testing the copystatic module"""
+
+import contextlib
+import io
+import os
+import unittest
+
+from copystatic import sync_static_dir
+from manifest import new_manifest
+from test_support import TempDirTestCase
+
+
+class TestSyncStaticDir(TempDirTestCase):
+    """Class for testing incremental static syncs"""
+
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "PNG" * 1000)
+        self.manifest = new_manifest()
+
+    def sync(self, **kwargs):
+        """Helper to run a quiet sync"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sync_static_dir(self.static, self.public, self.manifest, **kwargs)
+
+    def test_copy_then_skip(self):
+        """Test files are copied once and skipped when unchanged"""
+        self.assertEqual(self.sync(), {"copied": 2, "skipped": 0, "removed": 0})
+        self.assertEqual(
+            self.read(os.path.join(self.public, "images", "logo.png")), "PNG" * 1000
+        )
+        self.assertEqual(self.sync(), {"copied": 0, "skipped": 2, "removed": 0})
+
+    def test_changed_file_is_copied(self):
+        """Test an edited file is copied again"""
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.sync(), {"copied": 1, "skipped": 1, "removed": 0})
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.css")), "body { margin: 0 }"
+        )
+
+    def test_hash_check_skips_touched_file(self):
+        """Test a file with a new mtime but the same contents is skipped with check_hash"""
+        self.sync()
+        os.utime(os.path.join(self.static, "index.css"), ns=(1, 1))
+        self.assertEqual(
+            self.sync(check_hash=True), {"copied": 0, "skipped": 2, "removed": 0}
+        )
+
+    def test_deleted_file_is_pruned(self):
+        """Test files removed from static are removed from public"""
+        self.sync()
+        self.write(os.path.join(self.public, "index.html"), "generated page")
+        os.remove(os.path.join(self.static, "images", "logo.png"))
+        self.assertEqual(self.sync(), {"copied": 0, "skipped": 1, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_changes_are_recorded(self):
+        """Test copied and removed files are reported in the changes list"""
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        os.remove(os.path.join(self.static, "images", "logo.png"))
+        changes = []
+        self.sync(changes=changes)
+        self.assertEqual(
+            changes,
+            [
+                ("M", os.path.join(self.public, "index.css")),
+                ("D", os.path.join(self.public, "images", "logo.png")),
+            ],
+        )
+
+    def test_hard_link(self):
+        """Test link mode hard links files into place"""
+        self.sync(link=True)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.static, "index.css"),
+                os.path.join(self.public, "index.css"),
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Module for testing the daemon module"""
+
+import contextlib
+import http.client
+import io
+import json
+import os
+import socket
+import threading
+import unittest
+
+from builder import Builder
+from daemon import LatencyRecorder, make_daemon
+from test_support import TempDirTestCase
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class UnixConnection(http.client.HTTPConnection):
+    """Class sending HTTP requests over a Unix socket"""
+
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+class TestDaemon(TempDirTestCase):
+    """Class for testing the endpoints of the render daemon"""
+
+    def setUp(self):
+        super().setUp()
+        self.paths = self.site_paths()
+        os.makedirs(self.paths["content"])
+        os.makedirs(self.paths["public"])
+        self.write(self.paths["template"], TEMPLATE)
+        self.builder = Builder(self.paths, os.path.join(self.root, "manifest.json"))
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        super().tearDown()
+
+    def start(self, **kwargs):
+        """Helper to run a daemon on a background thread"""
+        server = make_daemon(self.builder, **kwargs)
+        threading.Thread(
+            target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        ).start()
+        self.servers.append(server)
+        return server
+
+    def request(self, connection, method, path, body=None):
+        """Helper to send a request and return its status and decoded body"""
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        return response.status, response.read().decode("utf-8")
+
+    def test_endpoints_over_http(self):
+        """Test render, page, rebuild and stats over a local port"""
+        server = self.start(port=0)
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        self.assertEqual(
+            self.request(connection, "POST", "/render", b"# Hi\n\n**there**"),
+            (200, "<div><h1>Hi</h1><p><b>there</b></p></div>"),
+        )
+        status, body = self.request(connection, "POST", "/page", b"# Hi")
+        self.assertEqual((status, body), (200, "<title>Hi</title><main><div><h1>Hi</h1></div></main>"))
+        self.assertEqual(self.request(connection, "POST", "/page", b"no title")[0], 400)
+
+        page = os.path.join(self.paths["content"], "index.md")
+        with open(page, "w", encoding="utf-8") as f:
+            f.write("# Home")
+        with contextlib.redirect_stdout(io.StringIO()):
+            status, body = self.request(
+                connection, "POST", "/rebuild", json.dumps({"paths": [page]}).encode()
+            )
+        self.assertEqual((status, json.loads(body)["touched"]), (200, 1))
+        self.assertTrue(os.path.isfile(os.path.join(self.paths["public"], "index.html")))
+        self.assertEqual(self.request(connection, "POST", "/rebuild", b"[]")[0], 400)
+
+        status, body = self.request(connection, "GET", "/stats")
+        stats = json.loads(body)
+        self.assertEqual(stats["endpoints"]["/render"]["count"], 1)
+        self.assertEqual(stats["endpoints"]["/page"]["count"], 2)
+        self.assertEqual(
+            set(stats["endpoints"]["/rebuild"]), {"count", "p50", "p90", "p99", "max"}
+        )
+        self.assertGreater(stats["block_cache"]["misses"], 0)
+        self.assertEqual(self.request(connection, "GET", "/missing")[0], 404)
+        connection.close()
+
+    def test_unix_socket(self):
+        """Test the daemon answers over a Unix socket"""
+        path = os.path.join(self.root, "daemon.sock")
+        self.start(socket_path=path)
+        connection = UnixConnection(path)
+        self.assertEqual(
+            self.request(connection, "POST", "/render", b"text"), (200, "<div><p>text</p></div>")
+        )
+        connection.close()
+
+    def test_latency_percentiles(self):
+        """Test percentiles are taken over the most recent window of requests"""
+        recorder = LatencyRecorder(window=100)
+        for millis in range(1, 201):
+            recorder.record("/render", millis / 1000)
+        stats = recorder.stats()["/render"]
+        self.assertEqual(stats["count"], 200)
+        self.assertAlmostEqual(stats["p50"], 151)
+        self.assertAlmostEqual(stats["p99"], 200)
+        self.assertAlmostEqual(stats["max"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Module for testing the fileindex module"""
+
+import os
+import unittest
+
+from fileindex import KIND_FILE, KIND_MARKDOWN, file_entry, iter_files, scan_tree
+from test_support import TempDirTestCase
+
+
+class TestFileIndex(TempDirTestCase):
+    """Class for testing scandir based indexing"""
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.root, "blog", "post"))
+        os.mkdir(os.path.join(self.root, "empty"))
+        for rel_path, text in (
+            ("index.md", "# Home"),
+            ("about.txt", "about"),
+            (os.path.join("blog", "post", "index.md"), "# Post"),
+            (os.path.join("blog", "z.png"), "PNG"),
+        ):
+            self.write(rel_path, text)
+
+    def test_order_and_kinds(self):
+        """Test files come depth first in sorted order with their kind"""
+        files = list(iter_files(self.root))
+        self.assertEqual(
+            [(file.rel_path, file.kind) for file in files],
+            [
+                ("about.txt", KIND_FILE),
+                (os.path.join("blog", "post", "index.md"), KIND_MARKDOWN),
+                (os.path.join("blog", "z.png"), KIND_FILE),
+                ("index.md", KIND_MARKDOWN),
+            ],
+        )
+        self.assertEqual(files[0].path, os.path.join(self.root, "about.txt"))
+
+    def test_size_and_mtime(self):
+        """Test entries carry the size and mtime of the file"""
+        path = os.path.join(self.root, "blog", "z.png")
+        os.utime(path, ns=(5, 7))
+        entry = scan_tree(self.root)[path]
+        self.assertEqual((entry.size, entry.mtime_ns), (3, 7))
+        self.assertEqual(file_entry(path, self.root), entry)
+
+
+if __name__ == "__main__":
+    unittest.main()
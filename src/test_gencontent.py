@@ -0,0 +1,286 @@
+"""Module for testing the gencontent module"""
+
+import contextlib
+import io
+import os
+import unittest
+
+from gencontent import (
+    extract_title,
+    find_pages,
+    generate_pages_recursive,
+    iter_pages,
+)
+from manifest import AtomicOutput, hash_file, new_manifest
+from test_support import TempDirTestCase
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestIncrementalBuild(TempDirTestCase):
+    """Class for testing manifest driven rebuilds"""
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.mkdir(self.public)
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+        self.manifest = new_manifest()
+
+    def build(self, jobs=1, io_depth=0, changes=None, stream=False):
+        """Helper to run a quiet incremental build"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_pages_recursive(
+                self.content,
+                self.template,
+                self.public,
+                self.manifest,
+                jobs,
+                io_depth=io_depth,
+                changes=changes,
+                stream=stream,
+            )
+
+    def test_second_build_skips_everything(self):
+        """Test an unchanged tree is not regenerated"""
+        self.assertEqual(self.build(), {"generated": 2, "skipped": 0, "removed": 0})
+        self.assertEqual(self.build(), {"generated": 0, "skipped": 2, "removed": 0})
+
+    def test_changed_page_is_regenerated(self):
+        """Test only the edited page is regenerated"""
+        self.build()
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nNew")
+        self.assertEqual(self.build(), {"generated": 1, "skipped": 1, "removed": 0})
+        self.assertIn(
+            "<p>New</p>", self.read(os.path.join(self.public, "blog", "index.html"))
+        )
+
+    def test_template_change_rebuilds_all(self):
+        """Test a template edit regenerates every page"""
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), {"generated": 2, "skipped": 0, "removed": 0})
+
+    def test_deleted_source_removes_output(self):
+        """Test outputs of deleted sources are removed with their directory"""
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.assertEqual(self.build(), {"generated": 0, "skipped": 1, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_unchanged_stat_skips_hashing(self):
+        """Test a source whose size and mtime match the manifest is not hashed again"""
+        self.build()
+        index = os.path.join(self.content, "index.md")
+        self.manifest["pages"][index]["hash"] = "stale"
+        self.assertEqual(self.build()["skipped"], 2)
+        self.assertEqual(self.manifest["pages"][index]["hash"], "stale")
+        os.utime(index, ns=(1, 1))
+        self.assertEqual(self.build(), {"generated": 1, "skipped": 1, "removed": 0})
+        self.assertNotEqual(self.manifest["pages"][index]["hash"], "stale")
+
+    def test_missing_output_is_regenerated(self):
+        """Test a deleted output is rebuilt even though its source is unchanged"""
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        self.assertEqual(self.build(), {"generated": 1, "skipped": 1, "removed": 0})
+
+    def test_parallel_build_matches_serial(self):
+        """Test pages rendered in a process pool are identical to serial output"""
+        self.build()
+        serial = [
+            self.read(os.path.join(self.public, "index.html")),
+            self.read(os.path.join(self.public, "blog", "index.html")),
+        ]
+        self.manifest = new_manifest()
+        self.assertEqual(self.build(jobs=2)["generated"], 2)
+        parallel = [
+            self.read(os.path.join(self.public, "index.html")),
+            self.read(os.path.join(self.public, "blog", "index.html")),
+        ]
+        self.assertEqual(serial, parallel)
+
+    def test_parallel_error_names_source(self):
+        """Test a failing page in the pool reports its source path"""
+        broken = os.path.join(self.content, "blog", "index.md")
+        self.write(broken, "No heading here")
+        with self.assertRaises(RuntimeError) as ctx:
+            self.build(jobs=2)
+        self.assertIn(broken, str(ctx.exception))
+
+    def test_identical_output_is_not_rewritten(self):
+        """Test a regenerated page with the same html keeps its mtime and is not reported"""
+        self.build()
+        index = os.path.join(self.public, "index.html")
+        os.utime(index, ns=(1, 1))
+        self.write(self.template, TEMPLATE + "\n")
+        self.write(self.template, TEMPLATE)
+        self.manifest["template"] = None
+        for jobs, io_depth in ((1, 0), (1, 2), (2, 0)):
+            changes = []
+            self.assertEqual(self.build(jobs, io_depth, changes)["generated"], 2)
+            self.assertEqual(changes, [])
+            self.assertEqual(os.stat(index).st_mtime_ns, 1)
+            self.manifest["template"] = None
+
+    def test_changes_are_recorded(self):
+        """Test written and removed pages are reported in the changes list"""
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nNew")
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        changes = []
+        self.build(changes=changes)
+        self.assertEqual(
+            changes,
+            [
+                ("M", os.path.join(self.public, "index.html")),
+                ("D", os.path.join(self.public, "blog", "index.html")),
+            ],
+        )
+        self.assertEqual(
+            self.manifest["pages"][os.path.join(self.content, "index.md")]["output"],
+            hash_file(os.path.join(self.public, "index.html")),
+        )
+
+    def test_atomic_output(self):
+        """Test an output is replaced only when its contents change"""
+        path = os.path.join(self.public, "page.html")
+        with AtomicOutput(path) as out:
+            out.write("<p>one</p>")
+        self.assertTrue(out.changed)
+        self.assertEqual(out.digest, hash_file(path))
+        with AtomicOutput(path) as out:
+            out.write("<p>one</p>")
+        self.assertFalse(out.changed)
+        with AtomicOutput(path, out.digest) as out:
+            out.write("<p>two</p>")
+        self.assertTrue(out.changed)
+        self.assertEqual(self.read(path), "<p>two</p>")
+        with self.assertRaises(ValueError):
+            with AtomicOutput(path) as out:
+                out.write("<p>three</p>")
+                raise ValueError("render failed")
+        self.assertEqual(os.listdir(self.public), ["page.html"])
+        self.assertEqual(self.read(path), "<p>two</p>")
+
+    def test_async_build_matches_serial(self):
+        """Test pages built by the asyncio pipeline are identical to serial output"""
+        outputs = []
+        for index in range(6):
+            os.mkdir(os.path.join(self.content, f"post{index}"))
+            self.write(
+                os.path.join(self.content, f"post{index}", "index.md"),
+                f"# Post {index}\n\nSome *text* for post {index}",
+            )
+        for io_depth in (0, 2):
+            self.manifest = new_manifest()
+            self.assertEqual(self.build(io_depth=io_depth)["generated"], 8)
+            outputs.append(
+                [
+                    self.read(os.path.join(self.public, f"post{index}", "index.html"))
+                    for index in range(6)
+                ]
+            )
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn("<i>text</i>", outputs[1][5])
+
+    def test_iter_pages_order(self):
+        """Test the iterative walk yields pages depth first in sorted order"""
+        os.makedirs(os.path.join(self.content, "blog", "a"))
+        os.mkdir(os.path.join(self.content, "about"))
+        self.write(os.path.join(self.content, "blog", "a", "index.md"), "# A")
+        self.write(os.path.join(self.content, "about", "index.md"), "# About")
+        self.write(os.path.join(self.content, "notes.txt"), "not a page")
+        sources = [page[0].path for page in iter_pages(self.content, self.public)]
+        self.assertEqual(
+            [os.path.relpath(source, self.content) for source in sources],
+            [
+                os.path.join("about", "index.md"),
+                os.path.join("blog", "a", "index.md"),
+                os.path.join("blog", "index.md"),
+                "index.md",
+            ],
+        )
+        self.assertEqual(
+            find_pages(self.content, self.public)[0][1],
+            os.path.join(self.public, "about", "index.html"),
+        )
+
+    def test_stream_build_matches_serial(self):
+        """Test streamed pages are identical to serial output and skip unchanged sources"""
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n```\ncode\n\nmore\n```\n\n* one\n* **two**\n\n> quote",
+        )
+        self.build()
+        serial = self.read(os.path.join(self.public, "index.html"))
+        self.manifest = new_manifest()
+        changes = []
+        self.assertEqual(
+            self.build(stream=True, changes=changes),
+            {"generated": 2, "skipped": 0, "removed": 0},
+        )
+        self.assertEqual(changes, [])
+        self.assertEqual(self.read(os.path.join(self.public, "index.html")), serial)
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.assertEqual(
+            self.build(stream=True), {"generated": 0, "skipped": 1, "removed": 1}
+        )
+
+    def test_title_is_escaped(self):
+        """Test the title slot is escaped like the H1 in every build mode"""
+        page = os.path.join(self.public, "index.html")
+        self.write(os.path.join(self.content, "index.md"), "# Q&A <b>x</b>")
+        title = "Q&amp;A &lt;b&gt;x&lt;/b&gt;"
+        expected = f"<title>{title}</title><main><div><h1>{title}</h1></div></main>"
+        for kwargs in ({}, {"io_depth": 2}, {"stream": True}, {"jobs": 2}):
+            self.manifest = new_manifest()
+            self.build(**kwargs)
+            self.assertEqual(self.read(page), expected, kwargs)
+
+    def test_failed_build_does_not_hide_written_pages(self):
+        """Test a page written by a build that then failed is redone once its
+        source goes back to what the manifest last recorded"""
+        blog = os.path.join(self.content, "blog", "index.md")
+        home = os.path.join(self.content, "index.md")
+        for kwargs in ({}, {"stream": True}, {"io_depth": 2}):
+            self.manifest = new_manifest()
+            self.build(**kwargs)
+            self.write(blog, "# Blog\n\nEdited")
+            self.write(home, "# Home\n\nan *unpaired star")
+            with self.assertRaises(RuntimeError):
+                self.build(**kwargs)
+            self.write(blog, "# Blog\n\nPosts")
+            self.write(home, "# Home\n\nWelcome")
+            self.build(**kwargs)
+            self.assertIn("Posts", self.read(os.path.join(self.public, "blog", "index.html")), kwargs)
+
+    def test_async_error_names_source(self):
+        """Test a failing page in the asyncio pipeline reports its source path"""
+        broken = os.path.join(self.content, "blog", "index.md")
+        self.write(broken, "No heading here")
+        with self.assertRaises(RuntimeError) as ctx:
+            self.build(io_depth=2)
+        self.assertIn(broken, str(ctx.exception))
+
+
+class TestExtractTitle(unittest.TestCase):
+    """Class for testing extract_title"""
+
+    def test_extract_title(self):
+        """Test the title is taken from the H1"""
+        self.assertEqual(extract_title("# Hello\n\nWorld"), "Hello")
+
+    def test_extract_title_missing(self):
+        """Test a document without an H1 is rejected"""
+        with self.assertRaises(ValueError):
+            extract_title("Hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,15 +2,18 @@
 
 # pylint: disable=line-too-long
 
+import gc
+import io
+import sys
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import FROZEN_NODES, FrozenNode, HTMLNode, LeafNode, ParentNode, escape_html, freeze
 
-test_dict = {"href": '"https://www.google.com"', "target": '"_blank"'}
-test_dict2 = {"href": '"https://www.google.com"'}
+test_dict = {"href": "https://www.google.com", "target": "_blank"}
+test_dict2 = {"href": "https://www.google.com"}
 test_dict3 = {
-    "src": '"https://www.boot.dev/img/bootdev-logo-full-small.webp"',
-    "alt": '"boot.dev logo"',
+    "src": "https://www.boot.dev/img/bootdev-logo-full-small.webp",
+    "alt": "boot.dev logo",
 }
 test_list = [
     LeafNode("b", "Bold text"),
@@ -50,6 +53,20 @@ class TestHTMLNode(unittest.TestCase):
             node.props_to_html(), ' href="https://www.google.com" target="_blank"'
         )
 
+    def test_props_are_quoted_and_escaped(self):
+        """Test values are quoted and special characters escaped."""
+        node = HTMLNode(props={"alt": 'a "b" <c> & d', "src": "/x.png"})
+        self.assertEqual(
+            node.props_to_html(), ' alt="a &quot;b&quot; &lt;c&gt; &amp; d" src="/x.png"'
+        )
+
+    def test_escape_html(self):
+        """Test text keeps double quotes unless quote is set."""
+        self.assertEqual(escape_html('<a href="x">&</a>'), '&lt;a href="x"&gt;&amp;&lt;/a&gt;')
+        self.assertEqual(escape_html('"&"', True), "&quot;&amp;&quot;")
+        text = "nothing to escape"
+        self.assertIs(escape_html(text), text)
+
 
 class TestLeafNode(unittest.TestCase):
     """Tests for the LeafNode class."""
@@ -125,3 +142,100 @@ class TestParentNode(unittest.TestCase):
             node2.to_html(),
             '<a href="https://www.google.com"><p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p></a>',
         )
+
+    def test_iter_html_matches_to_html(self):
+        """Test streamed chunks join to the same output as to_html."""
+        node = ParentNode("a", [ParentNode("p", test_list)], test_dict2)
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html(self):
+        """Test streaming html output to a file object."""
+        node = ParentNode("p", test_list)
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(
+            buffer.getvalue(),
+            "<p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p>",
+        )
+
+    def test_deep_tree(self):
+        """Test deeply nested trees serialize without hitting the recursion limit."""
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        self.assertEqual(node.to_html(), "<span>" * 5000 + "x" + "</span>" * 5000)
+
+    def test_missing_children(self):
+        """Test ParentNode without children raises."""
+        with self.assertRaises(ValueError):
+            ParentNode("p", None).to_html()
+
+
+class TestFrozenNode(unittest.TestCase):
+    """Class for testing frozen node trees"""
+
+    def tearDown(self):
+        FROZEN_NODES.clear()
+
+    def test_freeze_matches_to_html(self):
+        """Test a frozen tree serializes like the tree it was frozen from."""
+        node = ParentNode("a", [ParentNode("p", test_list)], test_dict2)
+        frozen = freeze(node)
+        self.assertIsInstance(frozen, FrozenNode)
+        self.assertEqual(frozen.to_html(), node.to_html())
+        self.assertEqual("".join(frozen.iter_html()), node.to_html())
+        self.assertIs(freeze(frozen), frozen)
+
+    def test_identical_subtrees_are_shared(self):
+        """Test identical subtrees are frozen to one node and one html string."""
+        first = freeze(ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "y")]))
+        second = freeze(ParentNode("div", [ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "y")])]))
+        self.assertIs(second.children[0], first)
+        self.assertIs(second.children[0].html, first.html)
+        self.assertIsNot(freeze(ParentNode("p", [LeafNode("i", "x")])), first)
+
+    def test_frozen_nodes_are_immutable(self):
+        """Test attributes, children and props of a frozen node can't be changed."""
+        frozen = freeze(ParentNode("p", [LeafNode("a", "x", {"href": "/"})]))
+        with self.assertRaises(AttributeError):
+            frozen.tag = "div"
+        with self.assertRaises(AttributeError):
+            frozen.children.append(LeafNode(None, "y"))
+        with self.assertRaises(TypeError):
+            frozen.children[0].props["href"] = "/other"
+
+    def test_mutable_nodes_are_not_cached(self):
+        """Test changes to unfrozen nodes show in their html, and in a new freeze only."""
+        leaf = LeafNode("b", "old")
+        node = ParentNode("p", [leaf])
+        frozen = freeze(node)
+        leaf.value = "new"
+        self.assertEqual(frozen.to_html(), "<p><b>old</b></p>")
+        self.assertEqual(node.to_html(), "<p><b>new</b></p>")
+        self.assertEqual(freeze(node).to_html(), "<p><b>new</b></p>")
+        parent = ParentNode("div", [frozen])
+        parent.children.append(LeafNode(None, "tail"))
+        self.assertEqual(parent.to_html(), "<div><p><b>old</b></p>tail</div>")
+
+    def test_freeze_deep_tree(self):
+        """Test nesting deeper than the recursion limit freezes with the explicit stack."""
+        depth = sys.getrecursionlimit() + 100
+        node = LeafNode(None, "x")
+        for _ in range(depth):
+            node = ParentNode("i", [node])
+        self.assertEqual(freeze(node).to_html(), "<i>" * depth + "x" + "</i>" * depth)
+
+    def test_interned_nodes_die_with_their_trees(self):
+        """Test the intern table doesn't keep frozen trees alive once nothing uses them."""
+        frozen = freeze(ParentNode("p", [LeafNode("b", "x")]))
+        self.assertEqual(len(FROZEN_NODES), 2)
+        del frozen
+        gc.collect()
+        self.assertEqual(len(FROZEN_NODES), 0)
+
+    def test_freeze_invalid_tree(self):
+        """Test freezing raises the errors serializing would."""
+        with self.assertRaises(ValueError):
+            freeze(ParentNode("p", None))
+        with self.assertRaises(ValueError):
+            freeze(ParentNode("p", [LeafNode("b", None)]))
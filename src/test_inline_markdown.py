@@ -318,3 +318,42 @@ class TestTextToTextnode(unittest.TestCase):
             TextNode("link", "link", "https://boot.dev"),
         ]
         self.assertEqual(text_to_textnodes(text), lst)
+
+    def test_plain_text_fast_path(self):
+        """Test text without markup comes back as a single text node"""
+        self.assertEqual(
+            text_to_textnodes("Just some prose."), [TextNode("Just some prose.", "text")]
+        )
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_many_links(self):
+        """Test a link dense paragraph is split in order"""
+        text = " ".join(f"[{i}](/{i})" for i in range(3))
+        self.assertEqual(
+            text_to_textnodes(text),
+            [
+                TextNode("0", "link", "/0"),
+                TextNode(" ", "text"),
+                TextNode("1", "link", "/1"),
+                TextNode(" ", "text"),
+                TextNode("2", "link", "/2"),
+            ],
+        )
+
+    def test_delimiters_take_precedence(self):
+        """Test emphasis is split before links, as in the multi pass pipeline"""
+        self.assertEqual(
+            text_to_textnodes("**[a](/a)** and [b](/b)"),
+            [
+                TextNode("[a](/a)", "bold"),
+                TextNode(" and ", "text"),
+                TextNode("b", "link", "/b"),
+            ],
+        )
+
+    def test_unpaired_delimiter(self):
+        """Test an unpaired delimiter raises"""
+        with self.assertRaises(SyntaxError):
+            text_to_textnodes("This is *broken")
+        with self.assertRaises(SyntaxError):
+            text_to_textnodes("This is `broken")
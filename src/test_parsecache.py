@@ -0,0 +1,96 @@
+"""Module for testing the parsecache module"""
+
+import contextlib
+import io
+import os
+import threading
+import unittest
+
+from gencontent import generate_page
+from parsecache import ParseCache
+from test_support import TempDirTestCase
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestParseCache(TempDirTestCase):
+    """Class for testing the on-disk parse cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_root = os.path.join(self.root, "cache")
+
+    def test_round_trip(self):
+        """Test stored html is returned for the same markdown only"""
+        cache = ParseCache(self.cache_root, 1 << 20, version="a" * 64)
+        self.assertIsNone(cache.get("# Title"))
+        cache.put("# Title", "<div><h1>Title</h1></div>")
+        self.assertEqual(cache.get("# Title"), "<div><h1>Title</h1></div>")
+        self.assertIsNone(cache.get("# Other"))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_concurrent_puts(self):
+        """Test threads storing the same entry at once all succeed"""
+        cache = ParseCache(self.cache_root, 1 << 20, version="a" * 64)
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def put():
+            barrier.wait()
+            try:
+                for _ in range(50):
+                    cache.put("# Title", "<div><h1>Title</h1></div>")
+            except OSError as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(cache.get("# Title"), "<div><h1>Title</h1></div>")
+
+    def test_parser_version_invalidates(self):
+        """Test entries from another parser version miss and are pruned"""
+        ParseCache(self.cache_root, 1 << 20, version="a" * 64).put("# Title", "old")
+        cache = ParseCache(self.cache_root, 1 << 20, version="b" * 64)
+        self.assertIsNone(cache.get("# Title"))
+        cache.put("# Title", "new")
+        stats = cache.prune()
+        self.assertEqual(stats, {"removed": 1, "freed": 3, "kept": 3})
+        self.assertEqual(os.listdir(self.cache_root), ["b" * 16])
+
+    def test_prune_evicts_least_recently_used(self):
+        """Test prune keeps the most recently used entries within the size limit"""
+        cache = ParseCache(self.cache_root, 10, version="a" * 64)
+        for index, markdown in enumerate(["one", "two", "three"]):
+            cache.put(markdown, "x" * 5)
+            os.utime(cache.entry_path(markdown), ns=(index, index))
+        cache.get("one")
+        stats = cache.prune()
+        self.assertEqual(stats, {"removed": 1, "freed": 5, "kept": 10})
+        self.assertIsNotNone(cache.get("one"))
+        self.assertIsNone(cache.get("two"))
+        self.assertIsNotNone(cache.get("three"))
+
+    def test_generate_page_uses_cache(self):
+        """Test a page built from the cache matches one built by parsing"""
+        src = os.path.join(self.root, "page.md")
+        template = os.path.join(self.root, "template.html")
+        self.write(src, "# Title\n\nSome **bold** text")
+        self.write(template, TEMPLATE)
+        cache = ParseCache(self.cache_root, 1 << 20)
+        outputs = []
+        for index, page_cache in enumerate([None, cache, cache]):
+            dest = os.path.join(self.root, f"page{index}.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_page(src, template, dest, page_cache)
+            outputs.append(self.read(dest))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
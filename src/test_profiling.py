@@ -0,0 +1,72 @@
+"""Module for testing the profiling module"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import profiling
+from block_markdown import BLOCK_CACHE, markdown_to_html, write_markdown_html
+
+
+class TestProfiling(unittest.TestCase):
+    """Class for testing trace recording"""
+
+    def tearDown(self):
+        profiling.stop()
+
+    def test_off_by_default(self):
+        """Test nothing is recorded unless profiling was started"""
+        self.assertIsNone(profiling.ACTIVE)
+
+    def test_block_spans(self):
+        """Test markdown_to_html records a span per rendered block named by its
+        type, and none for blocks served from the block cache"""
+        BLOCK_CACHE.clear()
+        profiler = profiling.start()
+        markdown_to_html("# Title\n\nSome *text*\n\n- a\n- b")
+        markdown_to_html("# Title\n\nOther *text*")
+        profiling.stop()
+        blocks = [event["name"] for event in profiler.events if event["cat"] == "block"]
+        self.assertEqual(blocks, ["heading", "paragraph", "unordered_list", "paragraph"])
+        self.assertEqual(BLOCK_CACHE.stats()["hits"], 1)
+        self.assertIsNone(profiling.ACTIVE)
+
+    def test_streamed_block_spans(self):
+        """Test write_markdown_html records read, classify, render and write spans per block"""
+        profiler = profiling.start()
+        write_markdown_html(io.StringIO("# Title\n\nSome *text*"), io.StringIO())
+        profiling.stop()
+        names = [event["name"] for event in profiler.events if event["name"] != "text_to_textnodes"]
+        self.assertEqual(
+            names,
+            ["read", "classify_block", "heading", "write"]
+            + ["read", "classify_block", "paragraph", "write", "read"],
+        )
+
+    def test_trace_and_summary(self):
+        """Test the trace file is valid Chrome trace JSON and the summary lists pages"""
+        profiler = profiling.start()
+        with profiler.span("page", "page", source="content/index.md"):
+            with profiler.span("read", "stage"):
+                pass
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "trace.json")
+            profiler.write_trace(path)
+            with open(path, "r", encoding="utf-8") as f:
+                events = json.load(f)["traceEvents"]
+        self.assertEqual([event["name"] for event in events], ["read", "page"])
+        self.assertTrue(all(event["ph"] == "X" for event in events))
+        summary = profiler.summary()
+        self.assertIn("content/index.md", summary)
+        self.assertIn("stage  read", summary)
+
+    @unittest.skipIf(profiling.resource is None, "resource module not available")
+    def test_peak_rss(self):
+        """Test the peak resident set size is reported in bytes"""
+        self.assertGreater(profiling.peak_rss(), 1 << 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Module for testing the searchindex module"""
+
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from gencontent import generate_pages_recursive
+from manifest import new_manifest
+from searchindex import (
+    SEARCH_CLIENT_NAME,
+    SEARCH_INDEX_NAME,
+    SearchIndex,
+    page_url,
+    remove_search_index,
+    search,
+    text_terms,
+)
+from test_support import TempDirTestCase
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestSearchHelpers(unittest.TestCase):
+    """Class for testing tokenizing and querying"""
+
+    def test_text_terms(self):
+        """Test words are lowercased and link targets left out"""
+        self.assertEqual(
+            text_terms("# The **Shire**\n\nSee [the_map](/shire/map.png) of the Shire"),
+            {"the": 3, "shire": 2, "see": 1, "map": 1, "of": 1},
+        )
+
+    def test_page_url(self):
+        """Test generated pages map to their directory urls"""
+        self.assertEqual(page_url(os.path.join("public", "index.html"), "public"), "/")
+        self.assertEqual(
+            page_url(os.path.join("public", "blog", "a", "index.html"), "public"), "/blog/a/"
+        )
+
+    def test_build_and_search(self):
+        """Test postings are delta encoded and queried by prefix"""
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SearchIndex(os.path.join(tmp, "search.json"))
+            index.update("c.md", "h1", "/c/", ("Cats", {"cat": 2, "dog": 1}))
+            index.update("a.md", "h2", "/a/", ("Dogs", {"dog": 3, "dogma": 1}))
+            built = index.build()
+        self.assertEqual(built["pages"], [["/a/", "Dogs"], ["/c/", "Cats"]])
+        self.assertEqual(built["terms"], ["cat", "dog", "dogma"])
+        self.assertEqual(built["postings"], [[1, 2], [0, 3, 1, 1], [0, 1]])
+        self.assertEqual(search(built, "do"), [("/a/", "Dogs", 4), ("/c/", "Cats", 1)])
+        self.assertEqual(search(built, "dog"), [("/a/", "Dogs", 7), ("/c/", "Cats", 2)])
+        self.assertEqual(search(built, "Dog CA"), [("/c/", "Cats", 4)])
+        self.assertEqual(search(built, "bird"), [])
+        self.assertEqual(search(built, "  "), [])
+
+
+class TestSearchBuild(TempDirTestCase):
+    """Class for testing the index is kept up to date by page generation"""
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.store = os.path.join(self.root, "search.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.mkdir(self.public)
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to the Shire")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts from Bree")
+        self.manifest = new_manifest()
+
+    def build(self, search_index=None, **kwargs):
+        """Helper to run a quiet incremental build and publish its index"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = generate_pages_recursive(
+                self.content,
+                self.template,
+                self.public,
+                self.manifest,
+                search=search_index,
+                **kwargs,
+            )
+        if search_index is not None:
+            search_index.save()
+            search_index.write(self.public)
+        return stats
+
+    def published(self):
+        """Helper to read the published index"""
+        with gzip.open(os.path.join(self.public, SEARCH_INDEX_NAME)) as f:
+            return json.load(f)
+
+    def test_every_build_path_indexes_the_same(self):
+        """Test serial, async, process pool and streaming builds publish one index"""
+        indexes = []
+        for kwargs in ({}, {"io_depth": 2}, {"jobs": 2}, {"stream": True}):
+            self.manifest = new_manifest()
+            self.build(SearchIndex(os.path.join(self.root, "fresh.json")), **kwargs)
+            indexes.append(self.published())
+        self.assertTrue(all(index == indexes[0] for index in indexes))
+        self.assertEqual(search(indexes[0], "bree"), [("/blog/", "Blog", 2)])
+        self.assertTrue(os.path.isfile(os.path.join(self.public, SEARCH_CLIENT_NAME)))
+
+    def test_incremental_update(self):
+        """Test only changed pages are reindexed and deleted pages dropped"""
+        self.build(SearchIndex(self.store))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to Rivendell")
+        stats = self.build(SearchIndex(self.store))
+        self.assertEqual((stats["generated"], stats["skipped"]), (1, 1))
+        self.assertEqual(search(self.published(), "rivendell"), [("/", "Home", 2)])
+        self.assertEqual(search(self.published(), "shire"), [])
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build(SearchIndex(self.store))
+        self.assertEqual(self.published()["pages"], [["/", "Home"]])
+
+    def test_pages_built_without_index_are_reindexed(self):
+        """Test pages changed by builds that kept no index are regenerated for it"""
+        self.build(SearchIndex(self.store))
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts from Moria")
+        self.build()
+        stats = self.build(SearchIndex(self.store))
+        self.assertEqual((stats["generated"], stats["skipped"]), (1, 1))
+        self.assertEqual(search(self.published(), "moria"), [("/blog/", "Blog", 2)])
+
+    def test_remove_search_index(self):
+        """Test the published files are removed and the removals recorded"""
+        self.build(SearchIndex(self.store))
+        changes = []
+        remove_search_index(self.public, changes)
+        self.assertEqual(len(changes), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.public, SEARCH_INDEX_NAME)))
+
+
+if __name__ == "__main__":
+    unittest.main()
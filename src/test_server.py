@@ -0,0 +1,140 @@
+"""Module for testing the server module"""
+
+import gzip
+import http.client
+import os
+import threading
+import unittest
+
+from server import FileCache, accepted_encodings, etag_matches, make_server
+from test_support import TempDirTestCase
+
+PAGE = "<html><body>" + "<p>hello</p>" * 200 + "</body></html>"
+
+
+class TestStaticServer(TempDirTestCase):
+    """Class for testing responses of the static server"""
+
+    def setUp(self):
+        super().setUp()
+        os.mkdir(os.path.join(self.root, "blog"))
+        self.write(os.path.join("blog", "index.html"), PAGE.encode())
+        self.write("index.css", b"body {}")
+        self.write("large.bin", os.urandom(4096))
+        self.server = make_server(self.root, 0, cache_bytes=1 << 20, host="127.0.0.1")
+        self.server.RequestHandlerClass.func.cache.max_file = 1024
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        ).start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def get(self, path, method="GET", **headers):
+        """Helper to send a request over the kept-alive connection"""
+        self.connection.request(method, path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_etag_and_not_modified(self):
+        """Test a matching If-None-Match gets a 304 and a changed file a new ETag"""
+        response, body = self.get("/index.css")
+        self.assertEqual((response.status, body), (200, b"body {}"))
+        etag = response.getheader("ETag")
+        response, body = self.get("/index.css", **{"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+        self.write("index.css", b"body { margin: 0 }")
+        response, body = self.get("/index.css", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader("ETag"), etag)
+
+    def test_precompressed_variant(self):
+        """Test a gzip variant is served only to clients that accept it"""
+        mtime = os.stat(os.path.join(self.root, "blog", "index.html")).st_mtime_ns
+        self.write(os.path.join("blog", "index.html.gz"), gzip.compress(PAGE.encode()), mtime)
+        response, body = self.get("/blog/", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body).decode(), PAGE)
+        response, body = self.get("/blog/", **{"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body.decode(), PAGE)
+
+    def test_large_file_and_head(self):
+        """Test files too large for the memory cache are sent whole and HEAD sends no body"""
+        response, body = self.get("/large.bin")
+        with open(os.path.join(self.root, "large.bin"), "rb") as f:
+            self.assertEqual(body, f.read())
+        response, body = self.get("/large.bin", method="HEAD")
+        self.assertEqual((response.getheader("Content-Length"), body), ("4096", b""))
+
+    def test_redirect_and_missing(self):
+        """Test directories without a trailing slash redirect and missing files 404"""
+        response, _ = self.get("/blog")
+        self.assertEqual((response.status, response.getheader("Location")), (301, "/blog/"))
+        response, _ = self.get("/missing.html")
+        self.assertEqual(response.status, 404)
+
+    def test_fingerprinted_assets_are_immutable(self):
+        """Test paths listed in the asset manifest are cached without revalidation"""
+        self.write("index.0123456789.css", b"body {}")
+        self.write("other.abcdefabcd.css", b"body {}")
+        response, _ = self.get("/index.0123456789.css")
+        self.assertEqual(response.getheader("Cache-Control"), "public, max-age=3600")
+        self.write("asset-manifest.json", b'{"/index.css": "/index.0123456789.css"}')
+        response, _ = self.get("/index.0123456789.css")
+        self.assertEqual(
+            response.getheader("Cache-Control"), "public, max-age=31536000, immutable"
+        )
+        response, _ = self.get("/other.abcdefabcd.css")
+        self.assertEqual(response.getheader("Cache-Control"), "public, max-age=3600")
+
+
+class TestServerHelpers(TempDirTestCase):
+    """Class for testing the header helpers and the file cache"""
+
+    def test_accepted_encodings(self):
+        """Test codings with a q of 0 are refused"""
+        self.assertEqual(accepted_encodings("gzip, deflate;q=0, zstd;q=0.5"), {"gzip", "zstd"})
+        self.assertEqual(accepted_encodings(None), set())
+
+    def test_etag_matches(self):
+        """Test If-None-Match lists, weak tags and the wildcard"""
+        self.assertTrue(etag_matches('"a", W/"b"', '"b"'))
+        self.assertTrue(etag_matches("*", '"c"'))
+        self.assertFalse(etag_matches('"a"', '"c"'))
+        self.assertFalse(etag_matches(None, '"c"'))
+
+    def test_file_cache_evicts_to_fit(self):
+        """Test the file cache stays within its byte limit"""
+        cache = FileCache(max_bytes=10)
+        paths = []
+        for name in ("a", "b", "c"):
+            paths.append(os.path.join(self.root, name))
+            self.write(name, b"x" * 4)
+            with open(paths[-1], "rb") as f:
+                cache.lookup(paths[-1], f)
+        self.assertLessEqual(cache.size, 10)
+        self.assertEqual(list(cache.entries), paths[1:])
+        with open(paths[2], "rb") as f:
+            cache.lookup(paths[2], f)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_file_cache_reads_the_open_file(self):
+        """Test a file renamed over the path after it was opened doesn't mix into the answer"""
+        cache = FileCache()
+        path = os.path.join(self.root, "page.html")
+        self.write(path, b"old")
+        with open(path, "rb") as f:
+            self.write(path + ".tmp", b"new body")
+            os.replace(path + ".tmp", path)
+            _, data = cache.lookup(path, f)
+            self.assertEqual((data, f.read()), (b"old", b"old"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Module of fixtures shared by the tests that build sites in a temporary directory"""
+
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Class for tests working under a temporary directory, self.root, which is
+    removed after each test"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, data, mtime=None):
+        """Helper to write text or bytes to a file, given absolute or relative to
+        the root, optionally setting its mtime in nanoseconds"""
+        path = os.path.join(self.root, path)
+        if isinstance(data, bytes):
+            with open(path, "wb") as f:
+                f.write(data)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+
+    def read(self, path):
+        """Helper to read a file, given absolute or relative to the root"""
+        with open(os.path.join(self.root, path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def site_paths(self):
+        """Helper that returns the content, static, template and public paths of
+        a site under the root, as main.py and Builder take them"""
+        return {
+            "content": os.path.join(self.root, "content"),
+            "static": os.path.join(self.root, "static"),
+            "template": os.path.join(self.root, "template.html"),
+            "public": os.path.join(self.root, "public"),
+        }
@@ -0,0 +1,81 @@
+"""Module for testing the template module"""
+
+import io
+import os
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import compile_template, load_template
+from test_support import TempDirTestCase
+
+
+class TestTemplate(TempDirTestCase):
+    """Class for testing compiled templates"""
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "template.html")
+
+    def render(self, template, context):
+        """Helper to render a template to a string"""
+        buffer = io.StringIO()
+        template.render(buffer, context)
+        return buffer.getvalue()
+
+    def test_segments(self):
+        """Test a template is split into literals and slots"""
+        self.write(self.path, "<title>{{ Title }}</title>{{ Content }}!")
+        self.assertEqual(
+            compile_template(self.path).segments,
+            [
+                (None, "<title>"),
+                ("Title", "{{ Title }}"),
+                (None, "</title>"),
+                ("Content", "{{ Content }}"),
+                (None, "!"),
+            ],
+        )
+
+    def test_render(self):
+        """Test strings and nodes fill slots and unknown slots are kept"""
+        self.write(self.path, "<h1>{{ Title }}</h1>{{ Content }}{{ Footer }}")
+        node = ParentNode("p", [LeafNode("b", "hi")])
+        self.assertEqual(
+            self.render(compile_template(self.path), {"Title": "A", "Content": node}),
+            "<h1>A</h1><p><b>hi</b></p>{{ Footer }}",
+        )
+
+    def test_include(self):
+        """Test includes are inlined relative to the including template"""
+        os.mkdir(os.path.join(self.root, "partials"))
+        self.write(
+            os.path.join(self.root, "partials", "head.html"), "<head>{{ Title }}</head>"
+        )
+        self.write(self.path, '{{ include "partials/head.html" }}<body></body>')
+        self.assertEqual(
+            self.render(compile_template(self.path), {"Title": "T"}),
+            "<head>T</head><body></body>",
+        )
+
+    def test_include_cycle(self):
+        """Test a template including itself is rejected"""
+        self.write(self.path, '{{ include "template.html" }}')
+        with self.assertRaises(ValueError):
+            compile_template(self.path)
+
+    def test_cache_invalidation(self):
+        """Test the cache is reused until the template contents change"""
+        self.write(self.path, "one {{ Title }}")
+        first = load_template(self.path)
+        self.assertIs(load_template(self.path), first)
+        os.utime(self.path, ns=(0, 0))
+        self.assertIs(load_template(self.path), first)
+        self.write(self.path, "two {{ Title }}")
+        os.utime(self.path, ns=(1, 1))
+        second = load_template(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(self.render(second, {"Title": "x"}), "two x")
+
+
+if __name__ == "__main__":
+    unittest.main()
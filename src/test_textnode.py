@@ -3,7 +3,7 @@
 import unittest
 
 from htmlnode import LeafNode
-from textnode import TextNode, text_node_to_html_node
+from textnode import TextNode, text_node_to_html_node, text_to_html_node
 
 
 class TestTextNode(unittest.TestCase):
@@ -48,14 +48,14 @@ text_node2 = TextNode("Hello World", "italic")
 text_node3 = TextNode("Hello World", "text")
 text_node4 = TextNode("print('hello world')", "code")
 text_node5 = TextNode(
-    '"boot.dev logo"',
+    "boot.dev logo",
     "image",
-    '"https://www.boot.dev/img/bootdev-logo-full-small.webp"',
+    "https://www.boot.dev/img/bootdev-logo-full-small.webp",
 )
 text_node6 = TextNode(
     "Click me!",
     "link",
-    '"https://www.boot.dev"',
+    "https://www.boot.dev",
 )
 
 
@@ -103,8 +103,8 @@ class TestTextNodeToHtmlNode(unittest.TestCase):
                 "img",
                 "",
                 {
-                    "src": '"https://www.boot.dev/img/bootdev-logo-full-small.webp"',
-                    "alt": '"boot.dev logo"',
+                    "src": "https://www.boot.dev/img/bootdev-logo-full-small.webp",
+                    "alt": "boot.dev logo",
                 },
             ).to_html(),
         )
@@ -119,10 +119,35 @@ class TestTextNodeToHtmlNode(unittest.TestCase):
             LeafNode(
                 "a",
                 "Click me!",
-                {"href": '"https://www.boot.dev"'},
+                {"href": "https://www.boot.dev"},
             ).to_html(),
         )
 
+    def test_text_to_html_node(self):
+        """Test building a leaf straight from span parts matches converting a TextNode"""
+        for node in (text_node1, text_node3, text_node4, text_node5, text_node6):
+            self.assertEqual(
+                text_to_html_node(node.text, node.text_type, node.url).to_html(),
+                text_node_to_html_node(node).to_html(),
+            )
+
+    def test_quotes_in_content_are_kept(self):
+        """Test double quotes around alt text and urls are escaped, not stripped"""
+        node = text_to_html_node('"Quoted"', "image", '"/x.png"')
+        self.assertEqual(node.to_html(), '<img src="&quot;/x.png&quot;" alt="&quot;Quoted&quot;">')
+        node = text_to_html_node("link", "link", '"/x"')
+        self.assertEqual(node.to_html(), '<a href="&quot;/x&quot;">link</a>')
+
+    def test_unknown_type(self):
+        """Test an unknown text type is rejected"""
+        with self.assertRaises(TypeError):
+            text_node_to_html_node(TextNode("x", "underline"))
+
+    def test_slots(self):
+        """Test nodes don't carry a per instance dictionary"""
+        self.assertFalse(hasattr(text_node1, "__dict__"))
+        self.assertFalse(hasattr(text_node_to_html_node(text_node1), "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
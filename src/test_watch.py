@@ -0,0 +1,97 @@
+"""Module for testing the watch module"""
+
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from gencontent import generate_pages_recursive
+from manifest import new_manifest
+from test_support import TempDirTestCase
+from watch import PollingWatcher, ReloadBroadcaster, apply_changes
+
+
+class TestApplyChanges(TempDirTestCase):
+    """Class for testing targeted rebuilds"""
+
+    def setUp(self):
+        super().setUp()
+        self.paths = self.site_paths()
+        os.makedirs(os.path.join(self.paths["content"], "blog"))
+        os.makedirs(self.paths["static"])
+        self.write(self.paths["template"], "{{ Title }}|{{ Content }}")
+        self.write(os.path.join(self.paths["content"], "index.md"), "# Home")
+        self.write(os.path.join(self.paths["content"], "blog", "index.md"), "# Blog")
+        self.manifest = new_manifest()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.paths["content"],
+                self.paths["template"],
+                self.paths["public"],
+                self.manifest,
+            )
+
+    def apply(self, changed):
+        """Helper to apply changes quietly"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return apply_changes(changed, self.paths, self.manifest)
+
+    def test_single_page(self):
+        """Test an edited page is the only output rebuilt"""
+        blog = os.path.join(self.paths["content"], "blog", "index.md")
+        self.write(blog, "# Blog\n\nNew post")
+        self.assertEqual(self.apply({blog}), 1)
+        self.assertIn(
+            "<p>New post</p>",
+            self.read(os.path.join(self.paths["public"], "blog", "index.html")),
+        )
+
+    def test_template_rebuilds_all(self):
+        """Test a template edit regenerates every page"""
+        self.write(self.paths["template"], "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.apply({self.paths["template"]}), 2)
+
+    def test_deleted_page_and_static(self):
+        """Test deleted pages and static files are removed from public"""
+        asset = os.path.join(self.paths["static"], "site.css")
+        self.write(asset, "body {}")
+        self.assertEqual(self.apply({asset}), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.paths["public"], "site.css")))
+        os.remove(asset)
+        blog_dir = os.path.join(self.paths["content"], "blog")
+        os.remove(os.path.join(blog_dir, "index.md"))
+        os.rmdir(blog_dir)
+        self.assertEqual(self.apply({asset, blog_dir}), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.paths["public"], "site.css")))
+        self.assertFalse(os.path.exists(os.path.join(self.paths["public"], "blog")))
+
+
+class TestWatchers(unittest.TestCase):
+    """Class for testing change detection and reload notification"""
+
+    def test_polling_watcher(self):
+        """Test the polling watcher reports a modified file"""
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "index.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("# One")
+            watcher = PollingWatcher([root], interval=0.01)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("# Two, longer")
+            self.assertEqual(watcher.wait(), {path})
+
+    def test_broadcaster(self):
+        """Test waiting connections wake up when a reload is announced"""
+        broadcaster = ReloadBroadcaster()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(broadcaster.wait(0, 5)))
+        thread.start()
+        broadcaster.notify()
+        thread.join()
+        self.assertEqual(results, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,25 @@
 """Module to handle functionality of text nodes"""
 
-from htmlnode import LeafNode
+from assets import asset_url
+from htmlnode import LeafNode, escape_html
+
+# Tags of the text types that become a plain tagged leaf when they carry no url.
+# Other known types without a url use their own name as the tag.
+TEXT_TYPE_TAGS = {
+    "text": None,
+    "bold": "b",
+    "italic": "i",
+    "code": "code",
+    "link": "link",
+    "image": "image",
+}
 
 
 class TextNode:
     """Class for creating text nodes."""
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -24,28 +38,19 @@ class TextNode:
 
 def text_node_to_html_node(text_node):
     """Function to convert text nodes into LeafNodes."""
-    types = ["text", "bold", "italic", "code", "link", "image"]
-
-    if text_node.text_type in types:
-        if text_node.url is not None:
-            if text_node.text_type == "link":
-                return LeafNode(
-                    tag="a",
-                    value=text_node.text,
-                    props={"href": text_node.url},
-                )
-            return LeafNode(
-                tag="img",
-                value="",
-                props={"src": text_node.url, "alt": text_node.text},
-            )
-        if text_node.text_type == "text":
-            return LeafNode(value=text_node.text)
-        if text_node.text_type == "bold":
-            return LeafNode(tag="b", value=text_node.text)
-        if text_node.text_type == "italic":
-            return LeafNode(tag="i", value=text_node.text)
-        return LeafNode(tag=text_node.text_type, value=text_node.text)
-    raise TypeError(
-        "text node type must be one of: text, bold, italic, code, link, image"
-    )
+    return text_to_html_node(text_node.text, text_node.text_type, text_node.url)
+
+
+def text_to_html_node(text, text_type, url=None):
+    """Function to build the LeafNode for an inline span directly from its parts,
+    so callers that don't need the TextNode can skip allocating one. The text is
+    escaped here, as it leaves markdown, since LeafNode values are written as is."""
+    if text_type not in TEXT_TYPE_TAGS:
+        raise TypeError(
+            "text node type must be one of: text, bold, italic, code, link, image"
+        )
+    if url is not None:
+        if text_type == "link":
+            return LeafNode("a", escape_html(text), {"href": url})
+        return LeafNode("img", "", {"src": asset_url(url), "alt": text})
+    return LeafNode(TEXT_TYPE_TAGS[text_type], escape_html(text))
@@ -0,0 +1,327 @@
+"""Module to rebuild the site as source files change and reload connected browsers"""
+
+# pylint: disable=line-too-long
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from copystatic import sync_file
+from fileindex import file_entry, iter_files
+from gencontent import generate_pages_recursive, update_page
+from manifest import remove_output, save_manifest
+from template import load_template
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = f'<script>new EventSource("{LIVERELOAD_PATH}").onmessage = () => location.reload();</script>'
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class ReloadBroadcaster:
+    """Class that wakes every waiting live reload connection when the site changes"""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        """Method to tell every connected browser to reload"""
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Method that blocks until the generation moves past the one given or the
+        timeout runs out, returning the current generation"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """Class serving the public directory with a live reload script injected into
+    html pages and a server-sent events endpoint that announces rebuilds"""
+
+    broadcaster = None
+
+    def do_GET(self):
+        if self.path == LIVERELOAD_PATH:
+            self.send_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        body = body.replace(b"</body>", LIVERELOAD_SCRIPT.encode() + b"</body>", 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        """Method to hold the connection open and send a reload event per rebuild"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        generation = self.broadcaster.generation
+        try:
+            while True:
+                current = self.broadcaster.wait(generation, 15)
+                if current == generation:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    generation = current
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if not self.path.startswith(LIVERELOAD_PATH):
+            super().log_message(format, *args)
+
+
+class PollingWatcher:
+    """Class that detects changed files by comparing periodic snapshots of their mtime and size"""
+
+    def __init__(self, roots, interval=0.1):
+        self.roots = list(roots)
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+
+    def add_file(self, path):
+        """Method to start watching another single file"""
+        if path not in self.roots:
+            self.roots.append(path)
+            self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        """Method that returns a {path: (mtime, size)} dictionary for every watched file"""
+        snapshot = {}
+        for root in self.roots:
+            if os.path.isfile(root):
+                stat = os.stat(root)
+                snapshot[root] = (stat.st_mtime_ns, stat.st_size)
+                continue
+            try:
+                for file in iter_files(root):
+                    snapshot[file.path] = (file.mtime_ns, file.size)
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self):
+        """Method that blocks until files change, returning the set of changed paths"""
+        while True:
+            time.sleep(self.interval)
+            snapshot = self.take_snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+
+class InotifyWatcher:
+    """Class that detects changed files with Linux inotify, so waiting for a change
+    costs nothing however large the watched trees are"""
+
+    def __init__(self, roots, settle=0.02):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.settle = settle
+        self.watches = {}
+        self.tree_watches = set()
+        self.files = set()
+        for root in roots:
+            if os.path.isfile(root):
+                self.add_file(root)
+            else:
+                self.add_tree(root)
+
+    def add_watch(self, dir_path):
+        """Method to watch a single directory, returning its watch descriptor"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), IN_WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dir_path}")
+        self.watches[wd] = dir_path
+        return wd
+
+    def add_file(self, path):
+        """Method to watch a single file through its parent directory"""
+        if os.path.normpath(path) in self.files:
+            return
+        self.files.add(os.path.normpath(path))
+        self.add_watch(os.path.dirname(path) or os.curdir)
+
+    def add_tree(self, root):
+        """Method to watch a directory and all of its subdirectories, returning the files found in them"""
+        found = set()
+        for dir_path, _, files in os.walk(root):
+            self.tree_watches.add(self.add_watch(dir_path))
+            found.update(os.path.join(dir_path, file) for file in files)
+        return found
+
+    def read_events(self):
+        """Method that drains the pending inotify events into a set of changed paths"""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                if wd not in self.watches or not name:
+                    continue
+                path = os.path.join(self.watches[wd], name)
+                if wd in self.tree_watches:
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        changed.update(self.add_tree(path))
+                    changed.add(path)
+                elif os.path.normpath(path) in self.files:
+                    changed.add(path)
+
+    def wait(self):
+        """Method that blocks until files change, returning the set of changed paths.
+        Events arriving shortly after the first are collected into the same set, so
+        an editor's write-then-rename save triggers a single rebuild."""
+        while True:
+            select.select([self.fd], [], [])
+            changed = self.read_events()
+            time.sleep(self.settle)
+            changed |= self.read_events()
+            if changed:
+                return changed
+
+
+def make_watcher(roots, interval=0.1):
+    """Function that returns an inotify watcher where the platform supports it and a polling watcher otherwise"""
+    if hasattr(os, "O_CLOEXEC") and ctypes.util.find_library("c"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots, interval)
+
+
+def apply_changes(changed, paths, manifest):
+    """Function that rebuilds only what a set of changed paths affects.
+
+    paths is a dictionary with content, static, template and public entries. A
+    change to the template or one of its includes regenerates every page, a
+    changed markdown file regenerates its page and a changed static file is
+    synced on its own. Returns the number of outputs touched."""
+    template = load_template(paths["template"])
+    template_files = {os.path.normpath(dep) for dep in template.dependencies}
+    content_prefix = paths["content"] + os.sep
+    static_prefix = paths["static"] + os.sep
+    touched = 0
+    if any(os.path.normpath(path) in template_files for path in changed):
+        stats = generate_pages_recursive(
+            paths["content"], paths["template"], paths["public"], manifest
+        )
+        touched += stats["generated"] + stats["removed"]
+        changed = {path for path in changed if not path.startswith(content_prefix)}
+    for path in sorted(changed):
+        if path.startswith(content_prefix) and (path.endswith(".md") or not os.path.isfile(path)):
+            if os.path.isdir(path):
+                continue
+            update_page(path, paths["content"], paths["template"], paths["public"], manifest)
+            touched += 1
+        elif path.startswith(static_prefix):
+            touched += update_static_file(path, paths["static"], paths["public"], manifest)
+    return touched
+
+
+def update_static_file(path, dir_path_static, dest_dir_path, manifest):
+    """Function to sync or remove a single static file and its manifest entry,
+    returning the number of outputs touched"""
+    rel_path = os.path.relpath(path, dir_path_static)
+    if os.path.isfile(path):
+        file = file_entry(path, dir_path_static)
+        sync_file(file, os.path.join(dest_dir_path, rel_path))
+        manifest["static"][rel_path] = [file.size, file.mtime_ns]
+        return 1
+    if os.path.isdir(path):
+        return 0
+    touched = 0
+    for entry in list(manifest["static"]):
+        if entry == rel_path or entry.startswith(rel_path + os.sep):
+            del manifest["static"][entry]
+            remove_output(os.path.join(dest_dir_path, entry), dest_dir_path)
+            touched += 1
+    return touched
+
+
+def watch(paths, manifest, manifest_path, port=8888, interval=0.1):
+    """Function to serve the public directory with live reload and rebuild what
+    changes under content, static and the template until interrupted"""
+    broadcaster = ReloadBroadcaster()
+    handler = partial(LiveReloadHandler, directory=paths["public"])
+    LiveReloadHandler.broadcaster = broadcaster
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    watcher = make_watcher(
+        [paths["content"], paths["static"], *load_template(paths["template"]).dependencies],
+        interval,
+    )
+    print(
+        f"***** Watching with {type(watcher).__name__}, serving http://localhost:{port} *****"
+    )
+    try:
+        while True:
+            changed = watcher.wait()
+            start = time.perf_counter()
+            try:
+                touched = apply_changes(changed, paths, manifest)
+            except (OSError, RuntimeError, ValueError, SyntaxError) as err:
+                print(f"***** Rebuild failed: {err} *****")
+                continue
+            finally:
+                # Saved on failure too, to record the pages written before it
+                save_manifest(manifest_path, manifest)
+            for dep in load_template(paths["template"]).dependencies:
+                watcher.add_file(dep)
+            if touched:
+                broadcaster.notify()
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"***** Rebuilt {touched} outputs in {elapsed:.1f} ms *****")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()